@@ -0,0 +1,69 @@
+"""Memory and per-check cost of the auth filters: user_data walk vs EchoAuth.
+
+Fills user_data with synthetic AUTH chats (two thirds with three thread ids),
+measures it and the EchoAuth index built from it with tracemalloc, then times
+the core of the old and new authorized filter on random chats.
+
+Run from the repo root: python benchmarks/bench_authidx.py [chats]
+"""
+import random
+import sys
+import tracemalloc
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import Config  # noqa: E402
+from echobotz import auth_chats, sudo_users, user_data  # noqa: E402
+from echobotz.helper.utils.authidx import EchoAuth  # noqa: E402
+
+CHECKS = 300000
+UID = 5
+THREAD = 3
+
+
+# The authorized filter before EchoAuth, minus the update unpacking
+def _old(uid, chat_id, thread_id):
+    if uid == Config.OWNER_ID or uid in sudo_users:
+        return True
+    if uid in user_data and (
+        user_data[uid].get("AUTH", False) or user_data[uid].get("SUDO", False)
+    ):
+        return True
+    if chat_id in user_data and user_data[chat_id].get("AUTH", False):
+        if thread_id is None or thread_id in user_data[chat_id].get("thread_ids", []):
+            return True
+    return chat_id in auth_chats or uid in auth_chats
+
+
+def _new(uid, chat_id, thread_id):
+    return uid in EchoAuth.allowed or EchoAuth.chat_ok(chat_id, thread_id)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    user_data.clear()
+    tracemalloc.start()
+    for i in range(n):
+        user_data[-10**12 - i] = (
+            {"AUTH": True, "thread_ids": [1, 2, 3]} if i % 3 else {"AUTH": True}
+        )
+    dict_mem = tracemalloc.get_traced_memory()[0]
+    EchoAuth.rebuild()
+    idx_mem = tracemalloc.get_traced_memory()[0] - dict_mem
+    tracemalloc.stop()
+    print(f"{n} chats: user_data {dict_mem / 2**20:.1f} MiB, index {idx_mem / 2**20:.1f} MiB")
+
+    rng = random.Random(0)
+    chats = [-10**12 - rng.randrange(n) for _ in range(CHECKS)]
+    for func in (_old, _new):
+        st = perf_counter()
+        for chat_id in chats:
+            func(UID, chat_id, THREAD)
+        took = (perf_counter() - st) / CHECKS * 1e9
+        print(f"{func.__name__[1:]:>4}: {took:.0f} ns/check")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Times automatic logo placement (/overlap ... auto) on synthetic posters.
+
+Run from the repo root: python benchmarks/bench_auto_pos.py
+"""
+import sys
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from echobotz.helper.overlay import _auto_pos, _composite, _scaled_logo  # noqa: E402
+
+SIZES = ((500, 750), (780, 1170), (1000, 1500), (2000, 3000))
+RUNS = 30
+
+
+# Gradient + noise so every placement has something to score
+def _poster(w, h, rng):
+    yy, xx = np.mgrid[0:h, 0:w]
+    arr = np.stack(
+        [xx * 255 // w, yy * 255 // h, rng.integers(0, 255, (h, w))], -1
+    ).astype(np.uint8)
+    return Image.fromarray(arr, "RGB")
+
+
+def _timed(func, runs=RUNS):
+    func()
+    st = perf_counter()
+    for _ in range(runs):
+        func()
+    return (perf_counter() - st) / runs * 1000
+
+
+def main():
+    rng = np.random.default_rng(0)
+    logo = Image.new("RGBA", (600, 200), (255, 255, 255, 200))
+    print(f"{'poster':>10}  {'_auto_pos':>10}  {'fixed':>8}  {'auto':>8}")
+    for w, h in SIZES:
+        im = _poster(w, h, rng)
+        lg = _scaled_logo(logo, w, 20)
+        auto = _timed(lambda: _auto_pos(im, lg))
+        fixed = _timed(lambda: _composite(im.copy(), lg, "b"))
+        full = _timed(lambda: _composite(im.copy(), lg, "auto"))
+        size = f"{w}x{h}"
+        print(f"{size:>10}  {auto:8.1f}ms  {fixed:6.1f}ms  {full:6.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Times update dispatch: per-handler pyrogram filters vs EchoRouter.
+
+The old layout is rebuilt from the handlers add_plugs used to register (same
+order and filters, no-op callbacks) and walked the way pyrogram's dispatcher
+does: check each handler in turn until one matches.
+
+Run from the repo root: python benchmarks/bench_router.py
+"""
+import asyncio
+import sys
+from pathlib import Path
+from time import perf_counter
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pyrogram import filters  # noqa: E402
+from pyrogram.enums import ChatType  # noqa: E402
+from pyrogram.handlers import CallbackQueryHandler, MessageHandler  # noqa: E402
+from pyrogram.types import CallbackQuery, Chat, Message, User  # noqa: E402
+
+from config import Config  # noqa: E402
+from echobotz.core.EchoClient import EchoBot  # noqa: E402
+from echobotz.core.router import EchoRouter  # noqa: E402
+from echobotz.helper.utils.authidx import EchoAuth  # noqa: E402
+from echobotz.helper.utils.bot_cmds import BotCommands  # noqa: E402
+from echobotz.helper.utils.filters import CustomFilters  # noqa: E402
+
+UPDATES = 20000
+UID = 1234
+
+AUTH, SUDO, NONE = CustomFilters.authorized, CustomFilters.sudo, None
+
+# (kind, commands or callback prefix, filter), in add_plugs order
+ROUTES = [
+    ("cmd", BotCommands.StartCommand, AUTH),
+    ("cmd", BotCommands.AuthorizeCommand, SUDO),
+    ("cmd", BotCommands.UnAuthorizeCommand, SUDO),
+    ("cmd", BotCommands.LogCommand, SUDO),
+    ("cb", "log", SUDO),
+    ("cmd", BotCommands.PingCommand, AUTH),
+    ("cmd", BotCommands.RestartCommand, SUDO),
+    ("cb", "restart", SUDO),
+    ("cmd", BotCommands.StatsCommand, SUDO),
+    ("cmd", BotCommands.BroadcastCommand, SUDO),
+    ("cmd", BotCommands.ImdbCommand, AUTH),
+    ("cb", "imdb", AUTH),
+    ("cmd", BotCommands.PosterCommand, AUTH),
+    ("cmd", BotCommands.BypassCommand, AUTH),
+    ("cb", "bpqh", NONE),
+    ("cmd", BotCommands.PosterSearchCommand, AUTH),
+    ("cmd", BotCommands.AnimeCommand, AUTH),
+    ("cb", "anime", AUTH),
+    ("cmd", BotCommands.OverlapCommand, AUTH),
+    ("cb", "ov", AUTH),
+    ("cmd", BotCommands.OverlapBatchCommand, AUTH),
+]
+
+
+async def _noop(client, update):
+    pass
+
+
+def _old_handlers():
+    out = []
+    for kind, key, flt in ROUTES:
+        if kind == "cmd":
+            f = filters.command(key, case_sensitive=True)
+            out.append(MessageHandler(_noop, f & flt if flt else f))
+        else:
+            f = filters.regex(rf"^{key} ")
+            out.append(CallbackQueryHandler(_noop, f & flt if flt else f))
+    return out
+
+
+def _router():
+    EchoRouter.cmds.clear()
+    EchoRouter.cbs.clear()
+    for kind, key, flt in ROUTES:
+        if kind == "cmd":
+            EchoRouter.command(key, _noop, flt)
+        else:
+            EchoRouter.callback(key, _noop, flt)
+
+
+def _message(client, text):
+    user = User(id=UID, first_name="bench")
+    chat = Chat(id=UID, type=ChatType.PRIVATE)
+    return Message(id=1, text=text, chat=chat, from_user=user, client=client)
+
+
+def _query(client, data):
+    user = User(id=UID, first_name="bench")
+    return CallbackQuery(
+        id="1",
+        from_user=user,
+        chat_instance="1",
+        data=data,
+        message=_message(client, "x"),
+        client=client,
+    )
+
+
+async def _old(client, handlers, update):
+    for h in handlers:
+        if isinstance(update, CallbackQuery) != isinstance(h, CallbackQueryHandler):
+            continue
+        if await h.check(client, update):
+            return
+
+
+async def _new(client, update):
+    if isinstance(update, CallbackQuery):
+        await EchoRouter._on_callback(client, update)
+    else:
+        await EchoRouter._on_message(client, update)
+
+
+async def _timed(func, update):
+    st = perf_counter()
+    for _ in range(UPDATES):
+        await func(update)
+    return (perf_counter() - st) / UPDATES * 1e6
+
+
+async def main():
+    Config.PUBLIC_MODE = False
+    EchoAuth.allowed = {UID}
+    EchoAuth.sudo = {UID}
+    EchoBot.USERNAME = "benchbot"
+    client = SimpleNamespace(me=SimpleNamespace(username=EchoBot.USERNAME))
+    handlers = _old_handlers()
+    _router()
+    cases = [
+        ("/overlap (last registered)", _message(client, "/overlap https://x y")),
+        ("/start (first registered)", _message(client, "/start")),
+        ("non-command text", _message(client, "just chatting here")),
+        ("'ov ...' callback", _query(client, "ov 1 2 3")),
+    ]
+    print(f"{'update':>28}  {'old us':>8}  {'router us':>9}")
+    for name, update in cases:
+        old = await _timed(lambda u: _old(client, handlers, u), update)
+        new = await _timed(lambda u: _new(client, u), update)
+        print(f"{name:>28}  {old:>8.1f}  {new:>9.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
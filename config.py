@@ -32,7 +32,57 @@ class Config:
     
     # TMDB Token is optional bot will use third party proxy (https://tmdbapi.the-zake.workers.dev) if u don't want to set TMDB token 
     TMDB_ACCESS_TOKEN = os.environ.get("TMDB_ACCESS_TOKEN", "")
-    
+    TMDB_CACHE_TTL = int(os.environ.get("TMDB_CACHE_TTL", 3600))
+    TMDB_CACHE_MB = int(os.environ.get("TMDB_CACHE_MB", 32))
+    IMDB_WORKERS = int(os.environ.get("IMDB_WORKERS", 8))
+    IMDB_CACHE_TTL = int(os.environ.get("IMDB_CACHE_TTL", 21600))
+
+    # Thread pools for file I/O and other blocking calls (IMDb has its own)
+    IO_WORKERS = int(os.environ.get("IO_WORKERS", 4))
+    EXEC_WORKERS = int(os.environ.get("EXEC_WORKERS", 8))
+
+    # Batched DB writes: flush every N seconds or once this many are pending
+    DB_FLUSH_INTERVAL = int(os.environ.get("DB_FLUSH_INTERVAL", 2))
+    DB_FLUSH_BATCH = int(os.environ.get("DB_FLUSH_BATCH", 500))
+    # Apply auth changes made by other instances sharing the DB (change
+    # stream on replica sets, else polled every DB_SYNC_INTERVAL seconds)
+    DB_SYNC = os.environ.get("DB_SYNC", "False").lower() == "true"
+    DB_SYNC_INTERVAL = int(os.environ.get("DB_SYNC_INTERVAL", 5))
+
+    # Shared aiohttp pool used for every upstream API/image request
+    HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", 100))
+    HTTP_PER_HOST = int(os.environ.get("HTTP_PER_HOST", 16))
+
+    # Broadcast send rate (msgs/sec, Telegram allows ~30) and concurrent senders
+    BROADCAST_RATE = float(os.environ.get("BROADCAST_RATE", 25))
+    BROADCAST_WORKERS = int(os.environ.get("BROADCAST_WORKERS", 20))
+
+    # Pillow process pool (/overlap) and max queued + running image jobs
+    IMG_WORKERS = int(os.environ.get("IMG_WORKERS", os.cpu_count() or 2))
+    IMG_QUEUE = int(os.environ.get("IMG_QUEUE", IMG_WORKERS * 4))
+    OVERLAP_MAX_MB = int(os.environ.get("OVERLAP_MAX_MB", 15))
+    OVERLAP_TTL = int(os.environ.get("OVERLAP_TTL", 900))
+    OVERLAP_PREVIEW_PX = int(os.environ.get("OVERLAP_PREVIEW_PX", 480))
+    OVERLAP_MEM_MB = int(os.environ.get("OVERLAP_MEM_MB", 128))
+    OVERLAP_DISK_MB = int(os.environ.get("OVERLAP_DISK_MB", 1024))
+    OVERLAP_SPILL_DIR = os.environ.get("OVERLAP_SPILL_DIR", "")
+    OVERLAP_BATCH_MAX = int(os.environ.get("OVERLAP_BATCH_MAX", 20))
+
+    # Handler lanes: concurrent tasks per lane, and how many may wait before
+    # new requests get a "busy" reply. Owner commands have their own uncapped lane.
+    TASK_SEARCH = int(os.environ.get("TASK_SEARCH", 32))
+    TASK_BYPASS = int(os.environ.get("TASK_BYPASS", 16))
+    TASK_IMAGE = int(os.environ.get("TASK_IMAGE", IMG_WORKERS * 2))
+    TASK_DEFAULT = int(os.environ.get("TASK_DEFAULT", 64))
+    TASK_QUEUE = int(os.environ.get("TASK_QUEUE", 100))
+    # Seconds running commands get to finish on stop/restart
+    DRAIN_TIMEOUT = int(os.environ.get("DRAIN_TIMEOUT", 30))
+
+    # Photos are fetched and fitted to Telegram's limits before upload
+    TG_PHOTO_MAX_PX = int(os.environ.get("TG_PHOTO_MAX_PX", 2560))
+    TG_PHOTO_MAX_KB = int(os.environ.get("TG_PHOTO_MAX_KB", 5120))
+    TG_IMG_CACHE_MB = int(os.environ.get("TG_IMG_CACHE_MB", 64))
+
     UPSTREAM_REPO = os.environ.get("UPSTREAM_REPO", "https://github.com/XalFH/Poster-Scraper-Bot")
     UPSTREAM_BRANCH = os.environ.get("UPSTREAM_BRANCH", "main")
 
@@ -4,6 +4,7 @@ import os
 from datetime import datetime
 from logging import Formatter
 from asyncio import gather
+from time import monotonic
 
 from pytz import timezone
 from pyrogram import idle
@@ -13,7 +14,10 @@ from . import LOGGER, bot_loop
 from .core.EchoClient import EchoBot
 from .core.plugs import add_plugs
 from .helper.utils.db import database
+from .helper.utils.sched import EchoSched
 from .helper.utils.bot_cmds import _get_bot_commands
+from .plugins.broadcast import _resume_broadcasts
+from .plugins.service import _shutdown
 
 try:
     from web import _start_web, _ping
@@ -22,8 +26,17 @@ except ImportError:
     WEB_OK = False
 
 
+async def _phase(times, name, coro):
+    st = monotonic()
+    try:
+        return await coro
+    finally:
+        times[name] = monotonic() - st
+
+
 async def main():
-    await database._load_all()
+    st = monotonic()
+    times = {}
 
     def changetz(*args):
         return datetime.now(timezone(Config.TIMEZONE)).timetuple()
@@ -31,13 +44,19 @@ async def main():
     Formatter.converter = changetz
 
     await gather(
-        EchoBot.start(),
+        _phase(times, "bot", EchoBot.start()),
+        _phase(times, "auth", database._load_all()),
+        _phase(times, "pm_users", database._load_pm_users()),
     )
 
-    await EchoBot.bot.set_bot_commands(_get_bot_commands())
+    await _phase(times, "commands", EchoBot.bot.set_bot_commands(_get_bot_commands()))
 
     add_plugs()
 
+    database._start_sync()
+
+    EchoSched.spawn(_resume_broadcasts())
+
     if os.path.isfile(".restartmsg"):
         try:
             with open(".restartmsg") as f:
@@ -65,10 +84,16 @@ async def main():
     else:
         LOGGER.info("Web server disabled")
 
-    LOGGER.info("EchoBot fully started")
+    LOGGER.info(
+        "EchoBot fully started in "
+        f"{monotonic() - st:.2f}s ("
+        + ", ".join(f"{k} {v:.2f}s" for k, v in times.items())
+        + ")"
+    )
 
     await idle()
 
+    await _shutdown()
     await EchoBot.stop()
 
 
@@ -0,0 +1,76 @@
+import re
+
+from pyrogram.handlers import MessageHandler, CallbackQueryHandler
+
+from .EchoClient import EchoBot
+from ..helper.utils.filters import CustomFilters
+
+_ARG_RE = re.compile(r"([\"'])(.*?)(?<!\\)\1|(\S+)")
+_ESC_RE = re.compile(r"\\([\"'])")
+
+
+# One message handler and one callback handler for the whole bot. Updates are
+# routed by command name / callback prefix through a dict, and only the
+# matched route's auth filter is awaited, instead of pyrogram running every
+# handler's command/regex + auth filter in turn.
+class EchoRouter:
+    cmds = {}
+    cbs = {}
+
+    @classmethod
+    def command(cls, names, func, flt=CustomFilters.authorized):
+        for name in names:
+            cls.cmds[name] = (func, flt)
+
+    @classmethod
+    def callback(cls, prefix, func, flt=CustomFilters.authorized):
+        cls.cbs[prefix] = (func, flt)
+
+    # Same result as filters.command: command[0] is the bare name and the
+    # rest are whitespace/quote split args. /cmd@otherbot is ignored, and so
+    # is a bare "/" or "/ cmd": the name has to follow the slash directly.
+    @staticmethod
+    def _parse(text):
+        if not text or text[0] != "/" or not text[1:2].strip():
+            return None
+        parts = text[1:].split(maxsplit=1)
+        name, _, at = parts[0].partition("@")
+        if not name or (at and at.lower() != (EchoBot.USERNAME or "").lower()):
+            return None
+        args = parts[1] if len(parts) > 1 else ""
+        return [name] + [
+            _ESC_RE.sub(r"\1", m.group(2) or m.group(3) or "")
+            for m in _ARG_RE.finditer(args)
+        ]
+
+    @classmethod
+    async def _on_message(cls, client, message):
+        cmd = cls._parse(message.text or message.caption)
+        if cmd is None:
+            return
+        route = cls.cmds.get(cmd[0])
+        if route is None:
+            return
+        func, flt = route
+        if flt is not None and not await flt(client, message):
+            return
+        message.command = cmd
+        await func(client, message)
+
+    @classmethod
+    async def _on_callback(cls, client, query):
+        data = query.data
+        if not isinstance(data, str):
+            return
+        route = cls.cbs.get(data.split(" ", 1)[0])
+        if route is None:
+            return
+        func, flt = route
+        if flt is not None and not await flt(client, query):
+            return
+        await func(client, query)
+
+    @classmethod
+    def attach(cls, client):
+        client.add_handler(MessageHandler(cls._on_message))
+        client.add_handler(CallbackQueryHandler(cls._on_callback))
@@ -1,10 +1,13 @@
-from requests import post
+from .utils.net import EchoHTTP
+from .utils.sflight import SingleFlight
 
 URL = "https://graphql.anilist.co"
 
+ANILIST_FLIGHT = SingleFlight("anilist")
 
-def _req(q, vars=None):
-    r = post(URL, json={"query": q, "variables": vars or {}}, timeout=10)
+
+async def _req(q, vars=None):
+    r = await EchoHTTP.post(URL, "anilist", json={"query": q, "variables": vars or {}})
     r.raise_for_status()
     j = r.json()
     if "errors" in j:
@@ -12,7 +15,7 @@ def _req(q, vars=None):
     return j["data"]
 
 
-def _search(title, per_page: int = 8):
+async def _search(title, per_page: int = 8):
     q = """
     query ($search: String, $perPage: Int) {
       Page(perPage: $perPage) {
@@ -32,11 +35,16 @@ def _search(title, per_page: int = 8):
       }
     }
     """
-    d = _req(q, {"search": title, "perPage": per_page})
+    d = await ANILIST_FLIGHT.do(
+        ("search", title.strip().lower(), per_page),
+        _req,
+        q,
+        {"search": title, "perPage": per_page},
+    )
     return d["Page"]["media"]
 
 
-def _get(aid: int):
+async def _get(aid: int):
     q = """
     query ($id: Int) {
       Media(id: $id, type: ANIME) {
@@ -96,5 +104,5 @@ def _get(aid: int):
       }
     }
     """
-    d = _req(q, {"id": aid})
+    d = await ANILIST_FLIGHT.do(("media", aid), _req, q, {"id": aid})
     return d["Media"]
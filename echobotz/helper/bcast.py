@@ -0,0 +1,122 @@
+from asyncio import Event, Queue, TimeoutError, create_task, gather, wait_for
+from time import monotonic
+
+from pyrogram.errors import FloodWait
+
+try:
+    from pyrogram.errors import FloodPremiumWait
+except ImportError:
+    FloodPremiumWait = FloodWait
+
+from config import Config
+from .. import LOGGER
+from .utils.limiter import TokenBucket
+from .utils.xtra import _get_readable_time
+
+
+class SendStats:
+    def __init__(self, total=0, done=0, counts=None):
+        self.total = total
+        self.done = done
+        self.counts = dict(counts or {})
+        self._base = done
+        self.start = monotonic()
+
+    def add(self, key):
+        self.done += 1
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+    def get(self, key):
+        return self.counts.get(key, 0)
+
+    @property
+    def elapsed(self):
+        return monotonic() - self.start
+
+    @property
+    def speed(self):
+        el = self.elapsed
+        return (self.done - self._base) / el if el > 0 else 0.0
+
+    @property
+    def eta(self):
+        sp = self.speed
+        if not self.total or not sp:
+            return "N/A"
+        return _get_readable_time(max(self.total - self.done, 0) / sp) or "0s"
+
+
+# Runs job(item) for every item through a bounded worker pool, with all
+# workers sharing one token bucket. job returns a stats key ("s", "b", ...).
+class EchoSender:
+    def __init__(self, rate=None, workers=None):
+        self.bucket = TokenBucket(rate or Config.BROADCAST_RATE)
+        self.workers = workers or Config.BROADCAST_WORKERS
+
+    async def _call(self, job, item):
+        for _ in range(3):
+            await self.bucket.acquire()
+            try:
+                res = await job(item)
+            except (FloodWait, FloodPremiumWait) as e:
+                self.bucket.penalize(e.value * 1.1)
+                LOGGER.warning(
+                    f"Sender FloodWait {e.value}s, rate now {self.bucket.rate:.1f}/s"
+                )
+                continue
+            self.bucket.reward()
+            return res
+        return "u"
+
+    async def run(self, items, job, stats, on_progress=None, on_done=None, interval=10):
+        q = Queue(maxsize=self.workers * 2)
+
+        async def _worker():
+            while True:
+                item = await q.get()
+                if item is None:
+                    return
+                try:
+                    res = await self._call(job, item)
+                except Exception as e:
+                    LOGGER.error(f"Sender job error: {e}")
+                    res = "u"
+                stats.add(res)
+                if on_done:
+                    on_done(item, res)
+
+        # Stopped through an event rather than cancel() so a checkpoint that
+        # is mid-write finishes instead of losing what it swapped out.
+        stop = Event()
+
+        async def _ticker():
+            while True:
+                try:
+                    await wait_for(stop.wait(), interval)
+                    return
+                except TimeoutError:
+                    pass
+                try:
+                    await on_progress(stats)
+                except Exception as e:
+                    LOGGER.error(f"Sender progress error: {e}")
+
+        workers = [create_task(_worker()) for _ in range(self.workers)]
+        ticker = create_task(_ticker()) if on_progress else None
+        try:
+            if hasattr(items, "__aiter__"):
+                async for item in items:
+                    await q.put(item)
+            else:
+                for item in items:
+                    await q.put(item)
+            for _ in workers:
+                await q.put(None)
+            await gather(*workers)
+        finally:
+            if ticker:
+                stop.set()
+                await ticker
+            for w in workers:
+                w.cancel()
+        return stats
@@ -1,8 +1,10 @@
 from urllib.parse import urlparse, quote_plus
-import requests
 
 from .. import LOGGER
-from .utils.xtra import _sync_to_async
+from .utils.net import EchoHTTP
+from .utils.sflight import SingleFlight
+
+BYPASS_FLIGHT = SingleFlight("bypass")
 
 class EchoBypass:
     def __init__(self, key, endpoint, method="GET", norm=None):
@@ -12,31 +14,32 @@ class EchoBypass:
         self.norm = norm or self._norm
 
     async def fetch(self, url):
+        return await BYPASS_FLIGHT.do((self.key, url.strip()), self._fetch, url)
+
+    async def _fetch(self, url):
         api_url = self.endpoint if self.method == "POST" else f"{self.endpoint}{quote_plus(url)}"
         LOGGER.info(f"[{self.key}] API URL: {api_url}")
 
         try:
             if self.method == "POST":
-                resp = await _sync_to_async(
-                    requests.post,
+                resp = await EchoHTTP.post(
                     api_url,
+                    "bypass",
                     json={"url": url},
-                    timeout=30
                 )
             else:
-                resp = await _sync_to_async(
-                    requests.get,
+                resp = await EchoHTTP.get(
                     api_url,
-                    timeout=30
+                    "bypass",
                 )
-            LOGGER.info(f"[{self.key}] Status Code: {resp.status_code}")
+            LOGGER.info(f"[{self.key}] Status Code: {resp.status}")
         except Exception as e:
             LOGGER.error(f"[{self.key}] HTTP error: {e}", exc_info=True)
             return None, "Failed to reach bypass service."
 
-        if resp.status_code != 200:
+        if resp.status != 200:
             LOGGER.error(
-                f"[{self.key}] API error {resp.status_code}: {resp.text[:200]}"
+                f"[{self.key}] API error {resp.status}: {resp.text[:200]}"
             )
             return None, "Bypass service error."
 
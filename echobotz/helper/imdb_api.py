@@ -0,0 +1,40 @@
+from time import monotonic
+
+from imdbinfo import search_title, get_movie
+
+from config import Config
+from .. import LOGGER
+from .utils.cache import EchoCache
+from .utils.execs import EchoExec
+from .utils.sflight import SingleFlight
+
+IMDB_CACHE = EchoCache("imdb", ttl=Config.IMDB_CACHE_TTL, maxsize=2048)
+IMDB_FLIGHT = SingleFlight("imdb")
+
+
+async def _run(func, *args):
+    st = monotonic()
+    res = await EchoExec.run("imdb", func, *args)
+    LOGGER.info(f"IMDB {func.__name__}{args} took {monotonic() - st:.2f}s")
+    return res
+
+
+async def _cached(key, func, *args):
+    res = IMDB_CACHE.get(key)
+    if res is not None:
+        return res
+    res = await IMDB_FLIGHT.do(key, _run, func, *args)
+    if res is not None:
+        IMDB_CACHE.set(key, res)
+    return res
+
+
+async def _search_title(title):
+    title = title.strip().lower()
+    res = await _cached(("search", title), search_title, title)
+    return res.titles if res else []
+
+
+async def _get_movie(movieid):
+    key = str(movieid).lower().removeprefix("tt")
+    return await _cached(("movie", key), get_movie, movieid)
@@ -1,9 +1,11 @@
 import re
 import json
 from urllib.parse import urlparse, quote_plus
-import requests
 from .. import LOGGER
-from .utils.xtra import _sync_to_async
+from .utils.net import EchoHTTP
+from .utils.sflight import SingleFlight
+
+OTT_FLIGHT = SingleFlight("ott")
 
 
 def _collect_url_pairs(node, out_list, parent_key=""):
@@ -173,15 +175,19 @@ async def _fetch_ott_info(cmd_name: str, target: str):
             return None, "Invalid URL."
 
     worker_url = f"{base}{quote_plus(target)}"
+    return await OTT_FLIGHT.do(worker_url, _worker_info, provider, worker_url)
+
+
+async def _worker_info(provider: str, worker_url: str):
     LOGGER.info(f"Fetching OTT via {worker_url}")
 
     try:
-        resp = await _sync_to_async(requests.get, worker_url, timeout=15)
+        resp = await EchoHTTP.get(worker_url, "ott")
     except Exception:
         return None, "Worker request failed."
 
-    if resp.status_code != 200:
-        return None, f"Worker error {resp.status_code}"
+    if resp.status != 200:
+        return None, f"Worker error {resp.status}"
 
     try:
         data = resp.json()
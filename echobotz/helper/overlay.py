@@ -0,0 +1,424 @@
+from asyncio import gather
+from collections import OrderedDict
+from io import BytesIO
+from mmap import mmap, ACCESS_READ
+from tempfile import TemporaryFile
+from time import time
+from zipfile import ZipFile, ZIP_STORED
+
+from config import Config
+from .. import LOGGER
+from .utils.imgpool import EchoImgPool, ShmBuf, to_shm
+
+try:
+    from PIL import Image
+except Exception as e:
+    Image = None
+    LOGGER.error(f"{e}")
+
+try:
+    import numpy as np
+except Exception as e:
+    np = None
+    LOGGER.error(f"{e}")
+
+POS_MAP = {
+    "tl": ("left", "top"),
+    "t": ("center", "top"),
+    "tr": ("right", "top"),
+    "ml": ("left", "center"),
+    "c": ("center", "center"),
+    "mr": ("right", "center"),
+    "bl": ("left", "bottom"),
+    "b": ("center", "bottom"),
+    "br": ("right", "bottom"),
+    "auto": ("auto", "auto"),
+}
+
+POS_NAME = {
+    "tl": "Top Left",
+    "t": "Top",
+    "tr": "Top Right",
+    "ml": "Middle Left",
+    "c": "Center",
+    "mr": "Middle Right",
+    "bl": "Bottom Left",
+    "b": "Bottom",
+    "br": "Bottom Right",
+    "auto": "Auto",
+}
+
+_LUMA = (0.299, 0.587, 0.114)
+
+
+def _place_coords(pw, ph, lw, lh, pos):
+    hx = {"left": 0, "center": (pw - lw) // 2, "right": pw - lw}
+    hy = {"top": 0, "center": (ph - lh) // 2, "bottom": ph - lh}
+    return hx[pos[0]], hy[pos[1]]
+
+
+def _scaled_logo(lg, pw, scale_percent):
+    scale = max(1, int(scale_percent))
+    tgt_w = max(1, pw * scale // 100)
+    wpercent = tgt_w / float(lg.size[0])
+    tgt_h = max(1, int((float(lg.size[1]) * float(wpercent))))
+    return lg.resize((tgt_w, tgt_h), Image.LANCZOS)
+
+
+def _prepare(pbytes, lbytes, scale_percent):
+    if Image is None:
+        raise RuntimeError("Pillow not found")
+
+    im = Image.open(BytesIO(pbytes)).convert("RGB")
+    lg = Image.open(BytesIO(lbytes)).convert("RGBA")
+    lg = _scaled_logo(lg, im.size[0], scale_percent)
+    return im.size, to_shm(im.tobytes()), lg.size, to_shm(lg.tobytes())
+
+
+# Same as _prepare but lets the JPEG decoder scale down via draft() and
+# shrinks anything else with reduce(), so only a thumbnail is ever decoded.
+def _prepare_preview(pbytes, lbytes, scale_percent, max_side):
+    if Image is None:
+        raise RuntimeError("Pillow not found")
+
+    im = Image.open(BytesIO(pbytes))
+    im.draft("RGB", (max_side, max_side))
+    im = im.convert("RGB")
+    im.thumbnail((max_side, max_side), Image.BILINEAR, reducing_gap=2.0)
+    lg = Image.open(BytesIO(lbytes)).convert("RGBA")
+    lg = _scaled_logo(lg, im.size[0], scale_percent)
+    return im.size, im.tobytes(), lg.size, lg.tobytes()
+
+
+# Scores the nine fixed placements on a <=512px copy of the poster using
+# summed-area tables: luminance std-dev + mean edge energy under each logo box
+# (busyness, lower is better) against the contrast between that box and the
+# logo's own alpha-weighted luminance (higher is better). Costs ~3 ms on a
+# 500x750 poster and ~17 ms at 2000x3000, where reduce() is ~10 ms of it;
+# see benchmarks/bench_auto_pos.py.
+def _auto_pos(im, lg, max_side=512):
+    if np is None:
+        return "b"
+
+    lw, lh = lg.size
+    f = max(1, -(-max(im.size) // max_side))
+    if f > 1:
+        im = im.reduce(f)
+        lw, lh = max(1, lw // f), max(1, lh // f)
+
+    luma = np.asarray(_LUMA, dtype=np.float32)
+    lum = np.asarray(im, dtype=np.float32) @ luma
+    edge = np.zeros_like(lum)
+    edge[:, 1:] += np.abs(np.diff(lum, axis=1))
+    edge[1:, :] += np.abs(np.diff(lum, axis=0))
+
+    h, w = lum.shape
+    keys = [k for k in POS_MAP if k != "auto"]
+    xy = np.array([_place_coords(w, h, lw, lh, POS_MAP[k]) for k in keys])
+    x0 = np.clip(xy[:, 0], 0, w)
+    y0 = np.clip(xy[:, 1], 0, h)
+    x1 = np.clip(x0 + lw, 0, w)
+    y1 = np.clip(y0 + lh, 0, h)
+    n = np.maximum((x1 - x0) * (y1 - y0), 1)
+
+    def _box(a):
+        sat = np.zeros((h + 1, w + 1), dtype=np.float64)
+        sat[1:, 1:] = a.cumsum(0).cumsum(1)
+        return sat[y1, x1] - sat[y0, x1] - sat[y1, x0] + sat[y0, x0]
+
+    mean = _box(lum) / n
+    std = np.sqrt(np.maximum(_box(lum * lum) / n - mean * mean, 0))
+    edges = _box(edge) / n
+
+    la = np.asarray(lg, dtype=np.float32)
+    alpha = la[..., 3] / 255.0
+    lmean = float(((la[..., :3] @ luma) * alpha).sum() / max(alpha.sum(), 1.0))
+    contrast = np.abs(mean - lmean)
+
+    eps = 1e-6
+    busy = std / (std.max() + eps) + edges / (edges.max() + eps)
+    score = busy - 0.5 * contrast / (contrast.max() + eps)
+    return keys[int(np.argmin(score))]
+
+
+def _composite(im, lg, pos_key):
+    if pos_key == "auto":
+        pos_key = _auto_pos(im, lg)
+    x, y = _place_coords(*im.size, *lg.size, POS_MAP.get(pos_key, ("center", "center")))
+    im.paste(lg, (x, y), lg)
+    return im
+
+
+def _render(pbuf, lbuf, psize, lsize, pos_key, quality=95):
+    im = Image.frombytes("RGB", psize, pbuf)
+    lg = Image.frombytes("RGBA", lsize, lbuf)
+
+    out = BytesIO()
+    _composite(im, lg, pos_key).save(out, format="JPEG", quality=quality)
+    return out.getvalue()
+
+
+def _render_grid(pbuf, lbuf, psize, lsize, quality=80, gap=6):
+    im = Image.frombytes("RGB", psize, pbuf)
+    lg = Image.frombytes("RGBA", lsize, lbuf)
+
+    cw, ch = max(1, psize[0] // 3), max(1, psize[1] // 3)
+    cell = im.resize((cw, ch), Image.BILINEAR)
+    lw = max(1, lsize[0] * cw // psize[0])
+    lh = max(1, lsize[1] * ch // psize[1])
+    lg = lg.resize((lw, lh), Image.BILINEAR)
+
+    grid = Image.new("RGB", (cw * 3 + gap * 2, ch * 3 + gap * 2), (255, 255, 255))
+    for i, key in enumerate(k for k in POS_MAP if k != "auto"):
+        r, c = divmod(i, 3)
+        grid.paste(_composite(cell.copy(), lg, key), (c * (cw + gap), r * (ch + gap)))
+
+    out = BytesIO()
+    grid.save(out, format="JPEG", quality=quality)
+    return out.getvalue()
+
+
+
+def _decode_logo(lbytes):
+    lg = Image.open(BytesIO(lbytes)).convert("RGBA")
+    return lg.size, to_shm(lg.tobytes())
+
+
+def _render_one(pbytes, lbuf, lsize, scale_percent, pos_key, quality=95):
+    im = Image.open(BytesIO(pbytes)).convert("RGB")
+    lg = _scaled_logo(Image.frombytes("RGBA", lsize, lbuf), im.size[0], scale_percent)
+
+    out = BytesIO()
+    _composite(im, lg, pos_key).save(out, format="JPEG", quality=quality)
+    return out.getvalue()
+
+
+# Batch mode: the logo is decoded once in the pool and its raw RGBA stays in
+# shared memory for every poster job, which then run across all image
+# workers at once. Failed posters come back as None so the caller can keep
+# the order.
+async def render_batch(posters, lbytes, scale, pos_key):
+    lsize, logo = await EchoImgPool.run(_decode_logo, lbytes)
+    try:
+        logo = ShmBuf.from_bytes(logo)
+    except OSError:
+        pass
+    res = await gather(
+        *(
+            EchoImgPool.run(
+                _render_one,
+                p,
+                logo,
+                lsize=lsize,
+                scale_percent=scale,
+                pos_key=pos_key,
+            )
+            for p in posters
+        ),
+        return_exceptions=True,
+    )
+    out = []
+    for r in res:
+        if isinstance(r, Exception):
+            LOGGER.error(f"Overlap batch render failed: {r}")
+            r = None
+        out.append(r)
+    return out
+
+
+def _zip_files(files):
+    buf = BytesIO()
+    with ZipFile(buf, "w", ZIP_STORED) as zf:
+        for name, data in files:
+            zf.writestr(name, data)
+    return buf.getvalue()
+
+# One /overlap request. Holds the downloaded sources and a thumbnail-sized
+# decode for previews; the full-size decode + pre-scaled logo is only built
+# on the first confirmed render, after which every position is a paste +
+# encode. Buffers live on the heap (shared memory is only used to hand them
+# to a worker) and are kept by name so the store can spill them to disk.
+class OverlaySession:
+    __slots__ = ("scale", "bufs", "sizes", "spilled", "touched")
+
+    def __init__(self, scale, pbytes, lbytes):
+        self.scale = scale
+        self.bufs = {"src_p": pbytes, "src_l": lbytes}
+        self.sizes = {}
+        self.spilled = set()
+        self.touched = time()
+
+    @classmethod
+    async def create(cls, pbytes, lbytes, scale):
+        self = cls(scale, pbytes, lbytes)
+        psize, poster, lsize, logo = await EchoImgPool.run(
+            _prepare_preview,
+            pbytes,
+            lbytes,
+            scale_percent=scale,
+            max_side=Config.OVERLAP_PREVIEW_PX,
+        )
+        self._add("pv_p", poster, psize)
+        self._add("pv_l", logo, lsize)
+        return self
+
+    def _add(self, name, buf, size=None):
+        self.bufs[name] = buf
+        self.spilled.discard(name)
+        if size is not None:
+            self.sizes[name] = size
+
+    @property
+    def mem_bytes(self):
+        return sum(len(b) for k, b in self.bufs.items() if k not in self.spilled)
+
+    @property
+    def disk_bytes(self):
+        return sum(len(b) for k, b in self.bufs.items() if k in self.spilled)
+
+    # Moves in-memory buffers to an unlinked temp file and maps them back
+    # read-only, so the kernel can page them out instead of them counting
+    # towards RSS.
+    def spill(self):
+        names = [k for k in self.bufs if k not in self.spilled]
+        if not names:
+            return 0
+        with TemporaryFile(prefix="echo_ovl_", dir=Config.OVERLAP_SPILL_DIR or None) as f:
+            for k in names:
+                f.write(self.bufs[k])
+            f.flush()
+            mm = mmap(f.fileno(), 0, access=ACCESS_READ)
+        view = memoryview(mm)
+        off = 0
+        for k in names:
+            n = len(self.bufs[k])
+            self.bufs[k] = view[off : off + n]
+            self.spilled.add(k)
+            off += n
+        return off
+
+    def expired(self, ttl=None):
+        return time() - self.touched > (ttl or Config.OVERLAP_TTL)
+
+    async def preview(self, pos_key=None):
+        self.touched = time()
+        b, s = self.bufs, self.sizes
+        if pos_key is None:
+            return await EchoImgPool.run(
+                _render_grid, b["pv_p"], b["pv_l"], psize=s["pv_p"], lsize=s["pv_l"]
+            )
+        return await EchoImgPool.run(
+            _render,
+            b["pv_p"],
+            b["pv_l"],
+            psize=s["pv_p"],
+            lsize=s["pv_l"],
+            pos_key=pos_key,
+            quality=80,
+        )
+
+    async def render(self, pos_key):
+        self.touched = time()
+        if "poster" not in self.bufs:
+            psize, poster, lsize, logo = await EchoImgPool.run(
+                _prepare, self.bufs["src_p"], self.bufs["src_l"], scale_percent=self.scale
+            )
+            self._add("poster", poster, psize)
+            self._add("logo", logo, lsize)
+        return await EchoImgPool.run(
+            _render,
+            self.bufs["poster"],
+            self.bufs["logo"],
+            psize=self.sizes["poster"],
+            lsize=self.sizes["logo"],
+            pos_key=pos_key,
+        )
+
+
+class OverlayStore:
+    def __init__(self, mem_budget, disk_budget, ttl):
+        self.mem_budget = mem_budget
+        self.disk_budget = disk_budget
+        self.ttl = ttl
+        self.spills = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def mem_bytes(self):
+        return sum(s.mem_bytes for s in self._data.values())
+
+    @property
+    def disk_bytes(self):
+        return sum(s.disk_bytes for s in self._data.values())
+
+    def prune(self):
+        for uid in [k for k, v in self._data.items() if v.expired(self.ttl)]:
+            self._data.pop(uid, None)
+            self.evictions += 1
+
+    def put(self, uid, session):
+        self._data.pop(uid, None)
+        self._data[uid] = session
+        self.balance()
+
+    def get(self, uid):
+        s = self._data.get(uid)
+        if s is None:
+            return None
+        if s.expired(self.ttl):
+            self._data.pop(uid, None)
+            self.evictions += 1
+            return None
+        self._data.move_to_end(uid)
+        return s
+
+    def pop(self, uid):
+        return self._data.pop(uid, None)
+
+    # Called after puts and whenever a session grows (e.g. full-size decode).
+    def balance(self):
+        self.prune()
+        mem = self.mem_bytes
+        for uid, s in list(self._data.items()):
+            if mem <= self.mem_budget:
+                break
+            held = s.mem_bytes
+            if not held:
+                continue
+            try:
+                s.spill()
+            except OSError as e:
+                LOGGER.error(f"Overlay spill failed: {e}")
+                self._data.pop(uid, None)
+                self.evictions += 1
+            else:
+                self.spills += 1
+            mem -= held
+        disk = self.disk_bytes
+        while self._data and disk > self.disk_budget:
+            _, s = self._data.popitem(last=False)
+            disk -= s.disk_bytes
+            self.evictions += 1
+
+    def stats(self):
+        spilled = sum(1 for s in self._data.values() if s.spilled)
+        return {
+            "name": "overlay",
+            "entries": len(self._data),
+            "spilled": spilled,
+            "mem_bytes": self.mem_bytes,
+            "disk_bytes": self.disk_bytes,
+            "spills": self.spills,
+            "evictions": self.evictions,
+        }
+
+
+OVER_STORE = OverlayStore(
+    Config.OVERLAP_MEM_MB * 1024 * 1024,
+    Config.OVERLAP_DISK_MB * 1024 * 1024,
+    Config.OVERLAP_TTL,
+)
@@ -1,7 +1,10 @@
 import re
-import requests
+import unicodedata
 from config import Config
 from .. import LOGGER
+from .utils.cache import EchoCache
+from .utils.net import EchoHTTP
+from .utils.sflight import SingleFlight
 
 BASE_DIRECT = "https://api.themoviedb.org/3"
 BASE_WORKER = "https://tmdbapi.the-zake.workers.dev/3" 
@@ -20,10 +23,47 @@ else:
 
 IMG = "https://image.tmdb.org/t/p/"
 
+TMDB_CACHE = EchoCache(
+    "tmdb",
+    ttl=Config.TMDB_CACHE_TTL,
+    max_bytes=Config.TMDB_CACHE_MB * 1024 * 1024,
+)
+TMDB_FLIGHT = SingleFlight("tmdb")
+
 def _n(s):
     return re.sub(r"[^a-z0-9]+", "", str(s).lower())
 
-def _s(q):
+# Cache/single-flight key for a query: unlike _n it keeps non-Latin letters,
+# so different Hindi, Japanese or Cyrillic titles don't share one key.
+def _qkey(s):
+    s = unicodedata.normalize("NFKC", str(s)).casefold()
+    return " ".join(
+        "".join(c if unicodedata.category(c)[0] in "LMN" else " " for c in s).split()
+    )
+
+async def _get_json(key, url, params):
+    data = TMDB_CACHE.get(key)
+    if data is not None:
+        return data
+    return await TMDB_FLIGHT.do(key, _fetch_json, key, url, params)
+
+async def _fetch_json(key, url, params):
+    hdrs = H
+    old = TMDB_CACHE.peek(key)
+    if old is not None and old.etag:
+        hdrs = {**H, "If-None-Match": old.etag}
+
+    resp = await EchoHTTP.get(url, "tmdb", headers=hdrs, params=params)
+    if resp.status == 304 and old is not None:
+        LOGGER.info(f"TMDB CACHE REVALIDATED: {key}")
+        return TMDB_CACHE.touch(key)
+
+    data = resp.json()
+    if resp.status == 200:
+        TMDB_CACHE.set(key, data, len(resp.content), resp.headers.get("ETag"))
+    return data
+
+async def _s(q):
     LOGGER.info(f"TMDB SEARCH QUERY: {q}")
 
     t = q.strip()
@@ -41,7 +81,7 @@ def _s(q):
         "page": 1,
     }
 
-    r = requests.get(f"{BASE}/search/multi", headers=H, params=p).json()
+    r = await _get_json(("search", _qkey(t) or t, y), f"{BASE}/search/multi", p)
     res = r.get("results") or []
     res = [x for x in res if x.get("media_type") in ("movie", "tv")]
 
@@ -128,7 +168,7 @@ def _pick_sets(items):
     use = en or oth or nul
     return use
 
-def _i(kind, mid):
+async def _i(kind, mid):
     if kind == "tv":
         url = f"{BASE}/tv/{mid}/images"
     else:
@@ -136,13 +176,13 @@ def _i(kind, mid):
 
     LOGGER.info(f"TMDB IMAGE FETCH URL: {url}")
 
-    r = requests.get(
+    r = await _get_json(
+        ("images", kind, mid),
         url,
-        headers=H,
-        params={
+        {
             "include_image_language": "en,null,hi,ta,te,ml,kn,bn,mr,gu,pa,ur,fr,es,de,it,ja,ko,zh",
-        }
-    ).json()
+        },
+    )
 
     d = {"posters": [], "backdrops": [], "logos": []}
 
@@ -0,0 +1,71 @@
+from config import Config
+from ... import user_data, auth_chats, sudo_users
+
+_EMPTY = ()
+
+
+# Small thread lists are scanned faster than they hash and cost a fraction
+# of a frozenset; large ones get the set.
+def _threads(ids):
+    if not ids:
+        return _EMPTY
+    return tuple(ids) if len(ids) <= 8 else frozenset(ids)
+
+
+# What the auth filters read, kept apart from user_data so startup can load
+# the auth collection straight into it and a check is a couple of set/dict
+# lookups. user_data then only holds ids a handler has hydrated; call
+# update(id) after changing one, or update(id, doc) for an id that isn't.
+class EchoAuth:
+    sudo = set()
+    allowed = set()
+    open_chats = frozenset()
+    chats = {}
+
+    @classmethod
+    def rebuild(cls):
+        cls.sudo = {Config.OWNER_ID, *sudo_users}
+        cls.open_chats = frozenset(auth_chats)
+        cls.allowed = cls.sudo | cls.open_chats
+        cls.chats = {}
+        for uid, data in user_data.items():
+            cls.load(uid, data)
+
+    @classmethod
+    def load(cls, uid, data):
+        if data.get("SUDO"):
+            cls.sudo.add(uid)
+            cls.allowed.add(uid)
+        if data.get("AUTH"):
+            cls.allowed.add(uid)
+            cls.chats[uid] = _threads(data.get("thread_ids"))
+
+    @classmethod
+    def update(cls, uid, data=None):
+        if uid != Config.OWNER_ID and uid not in sudo_users:
+            cls.sudo.discard(uid)
+            if uid not in cls.open_chats:
+                cls.allowed.discard(uid)
+        cls.chats.pop(uid, None)
+        if data is None:
+            data = user_data.get(uid)
+        cls.load(uid, data or {})
+
+    @classmethod
+    def chat_ok(cls, chat_id, thread_id):
+        threads = cls.chats.get(chat_id)
+        if threads is not None and (thread_id is None or thread_id in threads):
+            return True
+        return chat_id in cls.open_chats
+
+    @classmethod
+    def stats(cls):
+        return {
+            "allowed_ids": len(cls.allowed),
+            "auth_chats": len(cls.chats),
+            "sudo": len(cls.sudo),
+            "hydrated": len(user_data),
+        }
+
+
+EchoAuth.rebuild()
@@ -53,6 +53,8 @@ class BotCommands:
         "Restart": ["restart", "r"],
         "Broadcast": ["broadcast", "br"],
         "Overlap": ["overlap"],
+        "OverlapBatch": ["overlapbatch", "ob"],
+        "Stats": ["stats", "st"],
     }
 
     @classmethod
@@ -109,6 +111,8 @@ CMD_HELP = {
     "broadcast": "Broadcast message to users[Admins Only]",
     "start": "Start the bot",
     "overlap": "Overlay logo on poster",
+    "overlapbatch": "Overlay one logo on many posters or a TMDB title",
+    "stats": "Show cache, queue and pool stats[Admins Only]",
 }
 
 def _get_bot_commands():
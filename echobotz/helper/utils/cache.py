@@ -0,0 +1,101 @@
+from collections import OrderedDict
+from time import monotonic
+
+
+class _Entry:
+    __slots__ = ("value", "size", "expires", "etag")
+
+    def __init__(self, value, size, expires, etag):
+        self.value = value
+        self.size = size
+        self.expires = expires
+        self.etag = etag
+
+
+# LRU bounded by entry count and bytes; expired entries stay until evicted
+# so callers can revalidate them with their etag instead of refetching.
+class EchoCache:
+    def __init__(self, name, ttl=3600, maxsize=1024, max_bytes=32 * 1024 * 1024):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        e = self._data.get(key)
+        if e is None:
+            self.misses += 1
+            return default
+        if e.expires < monotonic():
+            self.stale += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return e.value
+
+    def peek(self, key):
+        return self._data.get(key)
+
+    def set(self, key, value, size=1, etag=None, ttl=None):
+        old = self._data.pop(key, None)
+        if old is not None:
+            self.bytes -= old.size
+        if size > self.max_bytes:
+            return
+        exp = monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = _Entry(value, size, exp, etag)
+        self.bytes += size
+        self._shrink()
+
+    def touch(self, key, ttl=None):
+        e = self._data.get(key)
+        if e is None:
+            return None
+        e.expires = monotonic() + (self.ttl if ttl is None else ttl)
+        self._data.move_to_end(key)
+        self.hits += 1
+        return e.value
+
+    def pop(self, key, default=None):
+        e = self._data.pop(key, None)
+        if e is None:
+            return default
+        self.bytes -= e.size
+        return e.value
+
+    def clear(self):
+        self._data.clear()
+        self.bytes = 0
+
+    def _shrink(self):
+        while self._data and (
+            len(self._data) > self.maxsize or self.bytes > self.max_bytes
+        ):
+            _, e = self._data.popitem(last=False)
+            self.bytes -= e.size
+            self.evictions += 1
+
+    def stats(self):
+        total = self.hits + self.misses + self.stale
+        return {
+            "name": self.name,
+            "entries": len(self._data),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
@@ -1,9 +1,71 @@
+from array import array
+from asyncio import (
+    CancelledError,
+    Event,
+    TimeoutError,
+    gather,
+    get_running_loop,
+    sleep,
+    wait_for,
+)
+from bisect import bisect_left
+from heapq import merge as heap_merge
+from time import monotonic, time
+from uuid import uuid4
+
+from bson.timestamp import Timestamp
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo.errors import PyMongoError
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure, PyMongoError
 from pymongo.server_api import ServerApi
 
 from config import Config
 from ... import LOGGER, user_data
+from .authidx import EchoAuth
+from .cache import EchoCache
+
+
+_AUTH_FIELDS = ("AUTH", "SUDO", "thread_ids")
+# Stamped on every auth write so other instances can tell whose it was and
+# poll by time; never copied into user_data.
+_SYNC_FIELDS = ("_id", "by", "updated_at")
+# Polls look back this many seconds to cover clock skew between instances
+_SYNC_SKEW = 5
+
+
+# Known PM user ids: a sorted array('q') (8 bytes per id) loaded once at
+# startup, plus a set of ids added since. The set is only folded into the
+# array once it outgrows 1/64 of it, so a /start storm costs set inserts and
+# the O(n) rebuild is amortized over many flushes.
+class _PmIndex:
+    __slots__ = ("ids", "new")
+
+    def __init__(self, ids=()):
+        self.ids = array("q", sorted(ids))
+        self.new = set()
+
+    def __len__(self):
+        return len(self.ids) + len(self.new)
+
+    def __contains__(self, uid):
+        if uid in self.new:
+            return True
+        i = bisect_left(self.ids, uid)
+        return i < len(self.ids) and self.ids[i] == uid
+
+    def add(self, uid):
+        self.new.add(uid)
+
+    def discard(self, uid):
+        self.new.discard(uid)
+        i = bisect_left(self.ids, uid)
+        if i < len(self.ids) and self.ids[i] == uid:
+            del self.ids[i]
+
+    def merge(self):
+        if len(self.new) > max(1024, len(self.ids) >> 6):
+            self.ids = array("q", heap_merge(self.ids, sorted(self.new)))
+            self.new.clear()
 
 
 class _DbManager:
@@ -11,6 +73,24 @@ class _DbManager:
         self._return = True
         self._conn = None
         self.db = None
+        self._fails = 0
+        self._retry_at = 0.0
+        self._fids = EchoCache("file_ids", ttl=30 * 86400, maxsize=8192)
+        self._pm = None
+        self._pm_queue = set()
+        self._pm_added = 0
+        self._dirty = {}
+        self._inflight = {}
+        self._stale = set()
+        self._hydrated = set()
+        self._wake = Event()
+        self._flusher = None
+        self._iid = uuid4().hex[:12]
+        self._sync_at = time()
+        self._resume = None
+        self._syncer = None
+        self._sync_mode = "off"
+        self._synced = 0
 
     async def _connect(self):
         try:
@@ -33,9 +113,19 @@ class _DbManager:
             self._return = True
             self._conn = None
 
+    # A failed connect is retried with exponential backoff (capped at five
+    # minutes), so callers hitting a dead or unset DATABASE_URL don't
+    # reconnect and log on every call.
     async def _ensure(self):
         if self._return or self.db is None:
+            if monotonic() < self._retry_at:
+                return False
             await self._connect()
+            if self._return:
+                self._fails += 1
+                self._retry_at = monotonic() + min(300, 2 ** self._fails)
+            else:
+                self._fails = 0
         return not self._return and self.db is not None
 
     async def _disconnect(self):
@@ -45,34 +135,218 @@ class _DbManager:
         self._conn = None
         self.db = None
 
-    async def _update_user_data(self, user_id: int):
-        if not await self._ensure():
+    # Write-behind: marks keys of user_data[user_id] dirty (all keys when none
+    # are given) and lets the flusher persist them. Keys no longer in
+    # user_data are $unset, but only for hydrated ids: on any other the local
+    # doc may be partial and a missing key says nothing about the stored one.
+    # Without DATABASE_URL user_data is memory-only and nothing is tracked.
+    async def _update_user_data(self, user_id: int, *keys):
+        EchoAuth.update(user_id)
+        if not Config.DATABASE_URL:
+            return
+        if keys and self._dirty.get(user_id, ()) is not None:
+            self._dirty.setdefault(user_id, set()).update(keys)
+        else:
+            self._dirty[user_id] = None
+        self._kick(len(self._dirty) + len(self._pm_queue))
+
+    async def _flush_user_data(self):
+        if not self._dirty or not await self._ensure():
             return
-        data = user_data.get(user_id, {})
+        batch, self._dirty = self._dirty, {}
+        self._inflight = batch
+        stamp = {"by": self._iid, "updated_at": time()}
+        ops = []
+        for uid, keys in batch.items():
+            data = user_data.get(uid, {})
+            upd = {}
+            if keys is None:
+                if data:
+                    upd["$set"] = dict(data)
+            else:
+                st = {k: data[k] for k in keys if k in data}
+                unset = (
+                    {k: "" for k in keys if k not in data}
+                    if uid in self._hydrated
+                    else {}
+                )
+                if st:
+                    upd["$set"] = st
+                if unset:
+                    upd["$unset"] = unset
+            if upd:
+                upd.setdefault("$set", {}).update(stamp)
+                ops.append(UpdateOne({"_id": uid}, upd, upsert=True))
         try:
-            await self.db.auth.update_one(
-                {"_id": user_id},
-                {"$set": data},
-                upsert=True,
-            )
+            if ops:
+                await self.db.auth.bulk_write(ops, ordered=False)
+                LOGGER.info(f"Flushed user data for {len(ops)} ids")
+        except CancelledError:
+            self._requeue(batch)
+            raise
         except PyMongoError as e:
-            LOGGER.error(f"_update_user_data error: {e}")
+            LOGGER.error(f"_flush_user_data error: {e}")
+            self._requeue(batch)
+        finally:
+            self._inflight = {}
+        if self._stale:
+            stale, self._stale = self._stale, set()
+            await self._resync(stale)
+
+    # Local keys not yet confirmed in Mongo: dirty or in the batch being
+    # written. None means the whole doc.
+    def _pending_keys(self, uid):
+        dirty = self._dirty.get(uid, ())
+        inflight = self._inflight.get(uid, ())
+        if dirty is None or inflight is None:
+            return None
+        return {*dirty, *inflight}
 
+    # Puts a batch that didn't make it back in front of newer dirty keys;
+    # rewriting is safe as every op is an idempotent upsert.
+    def _requeue(self, batch):
+        for uid, keys in batch.items():
+            if uid not in self._dirty:
+                self._dirty[uid] = keys
+            elif keys is None or self._dirty[uid] is None:
+                self._dirty[uid] = None
+            else:
+                self._dirty[uid] |= keys
+
+    # Startup only needs what the auth filters read, so only authorized/sudo
+    # docs are loaded, only those fields, and straight into EchoAuth; a
+    # handler pulls the full doc into user_data with _hydrate when it needs it.
     async def _load_all(self):
         if not await self._ensure():
             return
+        st = self._sync_at = time()
         try:
-            cursor = self.db.auth.find({})
+            cursor = self.db.auth.find(
+                {"$or": [{"AUTH": True}, {"SUDO": True}]},
+                {k: 1 for k in _AUTH_FIELDS},
+            ).batch_size(1000)
+            EchoAuth.rebuild()
+            n = 0
             async for doc in cursor:
                 uid = doc.get("_id")
                 if uid is None:
                     continue
-                data = {k: v for k, v in doc.items() if k != "_id"}
-                user_data[uid] = data
-            LOGGER.info("Database loaded from MongoDB")
+                EchoAuth.load(uid, doc)
+                n += 1
+            LOGGER.info(f"Loaded {n} auth docs from MongoDB in {time() - st:.2f}s")
         except PyMongoError as e:
             LOGGER.error(f"_load_all error: {e}")
 
+    async def _hydrate(self, user_id: int):
+        if user_id in self._hydrated or not await self._ensure():
+            return
+        try:
+            doc = await self.db.auth.find_one({"_id": user_id})
+        except PyMongoError as e:
+            LOGGER.error(f"_hydrate error: {e}")
+            return
+        if doc:
+            # Locally changed keys win; a whole-doc change only $sets, so
+            # stored keys it lacks are still filled in.
+            dirty = self._pending_keys(user_id) or ()
+            data = user_data.setdefault(user_id, {})
+            for k, v in doc.items():
+                if k not in dirty and k not in _SYNC_FIELDS:
+                    data.setdefault(k, v)
+            EchoAuth.update(user_id)
+        self._hydrated.add(user_id)
+
+    # Other instances' auth writes are applied here as they land: through a
+    # change stream on replica sets, else by polling the updated_at index.
+    def _start_sync(self):
+        if Config.DB_SYNC and (self._syncer is None or self._syncer.done()):
+            self._syncer = get_running_loop().create_task(self._sync_loop())
+
+    def _stop_sync(self):
+        if self._syncer is not None:
+            self._syncer.cancel()
+            self._syncer = None
+        self._sync_mode = "off"
+
+    async def _sync_loop(self):
+        while True:
+            try:
+                if await self._ensure():
+                    if self._sync_mode != "poll":
+                        self._sync_mode = "stream"
+                        await self._watch()
+                    else:
+                        await self._poll()
+            except OperationFailure as e:
+                if self._sync_mode == "stream" and e.code == 40573:
+                    LOGGER.info("No replica set, syncing auth by polling")
+                    self._sync_mode = "poll"
+                    continue
+                LOGGER.error(f"_sync_loop error: {e}")
+            except PyMongoError as e:
+                LOGGER.error(f"_sync_loop error: {e}")
+            await sleep(Config.DB_SYNC_INTERVAL)
+
+    async def _watch(self):
+        opts = (
+            {"resume_after": self._resume}
+            if self._resume
+            else {"start_at_operation_time": Timestamp(int(self._sync_at), 0)}
+        )
+        async with self.db.auth.watch(
+            [{"$match": {"operationType": {"$in": ["insert", "update", "replace", "delete"]}}}],
+            full_document="updateLookup",
+            **opts,
+        ) as stream:
+            async for change in stream:
+                self._resume = stream.resume_token
+                self._apply(change["documentKey"]["_id"], change.get("fullDocument"))
+
+    async def _resync(self, uids):
+        try:
+            async for doc in self.db.auth.find({"_id": {"$in": list(uids)}}):
+                self._apply(doc["_id"], doc)
+        except PyMongoError as e:
+            LOGGER.error(f"_resync error: {e}")
+
+    # Deletes aren't visible to polling; auth docs are only ever updated.
+    async def _poll(self):
+        await self.db.auth.create_index("updated_at")
+        while True:
+            cursor = self.db.auth.find(
+                {"updated_at": {"$gt": self._sync_at - _SYNC_SKEW}}
+            ).sort("updated_at", 1)
+            async for doc in cursor:
+                self._sync_at = max(self._sync_at, doc["updated_at"])
+                self._apply(doc["_id"], doc)
+            await sleep(Config.DB_SYNC_INTERVAL)
+
+    # Applies a remote doc (None when deleted). Keys with local changes not
+    # yet confirmed written keep the local value, and ids caught mid-write
+    # are re-read by _resync once the write returns. Ids no handler has
+    # hydrated only update EchoAuth.
+    def _apply(self, uid, doc):
+        if doc is not None and doc.get("by") == self._iid:
+            return
+        if uid in self._inflight:
+            self._stale.add(uid)
+        dirty = self._pending_keys(uid)
+        if dirty is None:
+            return
+        doc = {k: v for k, v in (doc or {}).items() if k not in _SYNC_FIELDS}
+        self._synced += 1
+        data = user_data.get(uid)
+        if data is None and uid not in self._hydrated:
+            EchoAuth.update(uid, doc)
+            return
+        data = {k: v for k, v in (data or {}).items() if k in dirty}
+        data.update((k, v) for k, v in doc.items() if k not in dirty)
+        if data:
+            user_data[uid] = data
+        else:
+            user_data.pop(uid, None)
+        EchoAuth.update(uid)
+
     async def _get_pm_uids(self):
         if not await self._ensure():
             return []
@@ -82,17 +356,122 @@ class _DbManager:
             LOGGER.error(f"_get_pm_uids error: {e}")
             return []
 
-    async def _set_pm_user(self, user_id: int):
+    async def _count_pm_users(self):
+        if not await self._ensure():
+            return 0
+        try:
+            return await self.db.pm_users.count_documents({})
+        except PyMongoError as e:
+            LOGGER.error(f"_count_pm_users error: {e}")
+            return 0
+
+    async def _iter_pm_uids(self, after=None, batch: int = 1000):
         if not await self._ensure():
             return
+        query = {"_id": {"$gt": after}} if after is not None else {}
         try:
-            if not await self.db.pm_users.find_one({"_id": user_id}):
-                await self.db.pm_users.insert_one({"_id": user_id})
-                LOGGER.info(f"New PM User Added : {user_id}")
+            cursor = (
+                self.db.pm_users.find(query, {"_id": 1})
+                .sort("_id", 1)
+                .batch_size(batch)
+            )
+            async for doc in cursor:
+                yield doc["_id"]
         except PyMongoError as e:
-            LOGGER.error(f"_set_pm_user error: {e}")
+            LOGGER.error(f"_iter_pm_uids error: {e}")
+
+    async def _load_pm_users(self):
+        if not await self._ensure():
+            return
+        st = time()
+        try:
+            ids = array("q")
+            async for doc in self.db.pm_users.find({}, {"_id": 1}).batch_size(10000):
+                ids.append(doc["_id"])
+            self._pm = _PmIndex(ids)
+            LOGGER.info(f"Loaded {len(ids)} PM users in {time() - st:.2f}s")
+        except PyMongoError as e:
+            LOGGER.error(f"_load_pm_users error: {e}")
+
+    # Known users return without touching Mongo; new ones are queued and
+    # written by the flusher in one unordered bulk upsert. Without
+    # DATABASE_URL there is nowhere to write them, so nothing is queued.
+    async def _set_pm_user(self, user_id: int):
+        if not Config.DATABASE_URL:
+            return
+        if self._pm is not None:
+            if user_id in self._pm:
+                return
+            self._pm.add(user_id)
+        self._pm_queue.add(user_id)
+        self._kick(len(self._pm_queue))
+
+    def _kick(self, pending):
+        if not Config.DATABASE_URL:
+            return
+        if self._flusher is None or self._flusher.done():
+            self._flusher = get_running_loop().create_task(self._flush_loop())
+        if pending >= Config.DB_FLUSH_BATCH:
+            self._wake.set()
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await wait_for(self._wake.wait(), Config.DB_FLUSH_INTERVAL)
+            except TimeoutError:
+                pass
+            self._wake.clear()
+            await self._flush_pm_users()
+            await self._flush_user_data()
+
+    async def _flush_pm_users(self):
+        if not self._pm_queue or not Config.DATABASE_URL or not await self._ensure():
+            return
+        batch, self._pm_queue = self._pm_queue, set()
+        now = int(time())
+        try:
+            await self.db.pm_users.bulk_write(
+                [
+                    UpdateOne({"_id": uid}, {"$setOnInsert": {"at": now}}, upsert=True)
+                    for uid in batch
+                ],
+                ordered=False,
+            )
+            self._pm_added += len(batch)
+            LOGGER.info(f"New PM Users Added : {len(batch)}")
+        except CancelledError:
+            self._pm_queue |= batch
+            raise
+        except PyMongoError as e:
+            LOGGER.error(f"_flush_pm_users error: {e}")
+            self._pm_queue |= batch
+        if self._pm is not None:
+            self._pm.merge()
+
+    # The flusher may be mid-write; it requeues its batch when cancelled, so
+    # it is awaited before the final flush picks everything up.
+    async def _flush(self):
+        flusher, self._flusher = self._flusher, None
+        if flusher is not None:
+            flusher.cancel()
+            await gather(flusher, return_exceptions=True)
+        await self._flush_pm_users()
+        await self._flush_user_data()
+
+    def _write_stats(self):
+        return {
+            "known_pm_users": len(self._pm) if self._pm is not None else "not loaded",
+            "pending_pm_users": len(self._pm_queue),
+            "added_pm_users": self._pm_added,
+            "dirty_user_data": len(self._dirty),
+            "sync": self._sync_mode,
+            "synced_changes": self._synced,
+        }
 
     async def _rm_pm_user(self, user_id: int):
+        self._pm_queue.discard(user_id)
+        if self._pm is not None:
+            self._pm.discard(user_id)
         if not await self._ensure():
             return
         try:
@@ -100,5 +479,95 @@ class _DbManager:
         except PyMongoError as e:
             LOGGER.error(f"_rm_pm_user error: {e}")
 
+    # Without DATABASE_URL the file_id cache is memory-only; Mongo isn't
+    # tried (and logged about) on every photo send.
+    async def _get_file_id(self, key: str):
+        fid = self._fids.get(key)
+        if fid is not None or not Config.DATABASE_URL or not await self._ensure():
+            return fid
+        try:
+            doc = await self.db.file_ids.find_one({"_id": key})
+        except PyMongoError as e:
+            LOGGER.error(f"_get_file_id error: {e}")
+            return None
+        if doc:
+            fid = doc.get("file_id")
+            self._fids.set(key, fid)
+        return fid
+
+    async def _set_file_id(self, key: str, file_id: str):
+        self._fids.set(key, file_id)
+        if not Config.DATABASE_URL or not await self._ensure():
+            return
+        try:
+            await self.db.file_ids.update_one(
+                {"_id": key},
+                {"$set": {"file_id": file_id}},
+                upsert=True,
+            )
+        except PyMongoError as e:
+            LOGGER.error(f"_set_file_id error: {e}")
+
+    async def _rm_file_id(self, key: str):
+        self._fids.pop(key)
+        if not Config.DATABASE_URL or not await self._ensure():
+            return
+        try:
+            await self.db.file_ids.delete_one({"_id": key})
+        except PyMongoError as e:
+            LOGGER.error(f"_rm_file_id error: {e}")
+
+    async def _save_broadcast(self, bc_id: str, data: dict):
+        if not await self._ensure():
+            return
+        try:
+            await self.db.broadcasts.update_one(
+                {"_id": bc_id}, {"$set": data}, upsert=True
+            )
+        except PyMongoError as e:
+            LOGGER.error(f"_save_broadcast error: {e}")
+
+    async def _push_broadcast_msgs(self, bc_id: str, msgs: list):
+        if not msgs or not await self._ensure():
+            return
+        try:
+            await self.db.broadcasts.msgs.insert_one(
+                {"bc": bc_id, "msgs": [list(m) for m in msgs]}
+            )
+        except PyMongoError as e:
+            LOGGER.error(f"_push_broadcast_msgs error: {e}")
+
+    async def _get_broadcast(self, bc_id: str):
+        if not await self._ensure():
+            return None
+        try:
+            return await self.db.broadcasts.find_one({"_id": bc_id})
+        except PyMongoError as e:
+            LOGGER.error(f"_get_broadcast error: {e}")
+            return None
+
+    async def _get_broadcast_msgs(self, bc_id: str):
+        if not await self._ensure():
+            return []
+        try:
+            out = []
+            async for doc in self.db.broadcasts.msgs.find({"bc": bc_id}):
+                out.extend((uid, mid) for uid, mid in doc.get("msgs", []))
+            return out
+        except PyMongoError as e:
+            LOGGER.error(f"_get_broadcast_msgs error: {e}")
+            return []
+
+    async def _get_running_broadcasts(self):
+        if not await self._ensure():
+            return []
+        try:
+            return [
+                doc async for doc in self.db.broadcasts.find({"status": "running"})
+            ]
+        except PyMongoError as e:
+            LOGGER.error(f"_get_running_broadcasts error: {e}")
+            return []
+
 
 database = _DbManager()
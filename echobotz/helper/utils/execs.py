@@ -0,0 +1,76 @@
+from asyncio import get_running_loop
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from config import Config
+from ... import LOGGER
+
+
+def _timed(func, args, kwargs, queued):
+    st = perf_counter()
+    return func(*args, **kwargs), st - queued, perf_counter() - st
+
+
+class _Pool:
+    __slots__ = ("name", "workers", "pool", "pending", "jobs", "wait", "max_wait", "run")
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self.pending = 0
+        self.jobs = 0
+        self.wait = 0.0
+        self.max_wait = 0.0
+        self.run = 0.0
+
+    def stats(self):
+        n = self.jobs or 1
+        return {
+            "workers": self.workers,
+            "busy": min(self.pending, self.workers),
+            "queued": max(self.pending - self.workers, 0),
+            "saturation": f"{min(self.pending, self.workers) * 100 // self.workers}%",
+            "jobs": self.jobs,
+            "avg_wait": f"{self.wait / n * 1000:.1f}ms",
+            "max_wait": f"{self.max_wait * 1000:.1f}ms",
+            "avg_run": f"{self.run / n * 1000:.1f}ms",
+        }
+
+
+# Blocking calls run on a thread pool owned by their subsystem, so a backlog
+# in one (say slow IMDb scraping) can't starve the others the way a shared
+# default executor would. Queue wait and run time are measured per pool.
+class EchoExec:
+    pools = {
+        "imdb": _Pool("imdb", Config.IMDB_WORKERS),
+        "io": _Pool("io", Config.IO_WORKERS),
+        "default": _Pool("default", Config.EXEC_WORKERS),
+    }
+
+    @classmethod
+    async def run(cls, name, func, *args, **kwargs):
+        p = cls.pools[name]
+        p.pending += 1
+        try:
+            res, wait, took = await get_running_loop().run_in_executor(
+                p.pool, _timed, func, args, kwargs, perf_counter()
+            )
+        finally:
+            p.pending -= 1
+        p.jobs += 1
+        p.wait += wait
+        p.run += took
+        p.max_wait = max(p.max_wait, wait)
+        if wait > 1:
+            LOGGER.warning(f"Executor {name} saturated: {func.__name__} waited {wait:.2f}s")
+        return res
+
+    @classmethod
+    def stats(cls):
+        return {name: p.stats() for name, p in cls.pools.items()}
+
+    @classmethod
+    def shutdown(cls):
+        for p in cls.pools.values():
+            p.pool.shutdown(wait=False, cancel_futures=True)
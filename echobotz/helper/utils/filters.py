@@ -3,8 +3,9 @@ from pyrogram.errors import PeerIdInvalid, ChannelInvalid
 from pyrogram.filters import create
 
 from config import Config
-from ... import LOGGER, user_data, auth_chats, sudo_users
+from ... import LOGGER
 from ...core.EchoClient import EchoBot
+from .authidx import EchoAuth
 
 
 async def _chat_info(chat_id):
@@ -31,17 +32,7 @@ async def _owner_filter(_, client, update):
 async def _sudo_user_filter(_, client, update):
     user = (getattr(update, "from_user", None)
             or getattr(update, "sender_chat", None))
-    if not user:
-        return False
-    uid = user.id
-    return bool(
-        uid == Config.OWNER_ID
-        or uid in sudo_users
-        or (
-            uid in user_data
-            and user_data[uid].get("SUDO")
-        )
-    )
+    return bool(user and user.id in EchoAuth.sudo)
 
 
 async def _authorized_user_filter(_, client, update):
@@ -52,38 +43,20 @@ async def _authorized_user_filter(_, client, update):
             or getattr(update, "sender_chat", None))
     if not user:
         return False
-    uid = user.id
 
     msg = getattr(update, "message", None) or update
     chat = getattr(msg, "chat", None)
     if not chat:
         return False
 
-    chat_id = chat.id
+    if user.id in EchoAuth.allowed:
+        return True
     thread_id = (
         msg.message_thread_id
         if getattr(msg, "is_topic_message", False)
         else None
     )
-
-    if uid == Config.OWNER_ID:
-        return True
-    if uid in sudo_users:
-        return True
-    if uid in user_data and (
-        user_data[uid].get("AUTH", False)
-        or user_data[uid].get("SUDO", False)
-    ):
-        return True
-    if chat_id in user_data and user_data[chat_id].get("AUTH", False):
-        thread_ids = user_data[chat_id].get("thread_ids", [])
-        if thread_id is None or thread_id in thread_ids:
-            return True
-    if chat_id in auth_chats:
-        return True
-    if uid in auth_chats:
-        return True
-    return False
+    return EchoAuth.chat_ok(chat.id, thread_id)
 
 
 class CustomFilters:
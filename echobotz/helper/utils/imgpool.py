@@ -0,0 +1,213 @@
+from asyncio import Semaphore, get_running_loop
+from concurrent.futures import ProcessPoolExecutor
+from errno import ENOSPC
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from os import statvfs
+from time import monotonic, perf_counter
+from weakref import finalize
+
+from config import Config
+from ... import LOGGER
+
+
+# /dev/shm is a small tmpfs in containers (64 MB by default in Docker) and
+# writing past its end through the mapping is a SIGBUS, not an exception, so
+# every segment is checked against the free space first, leaving headroom
+# for other processes.
+_SHM_RESERVE = 8 * 1024 * 1024
+
+
+def _shm_fits(size):
+    try:
+        st = statvfs("/dev/shm")
+    except OSError:
+        return True
+    return size + _SHM_RESERVE <= st.f_bavail * st.f_frsize
+
+
+def _to_shm(data):
+    if not _shm_fits(len(data)):
+        raise OSError(ENOSPC, "not enough free space in /dev/shm")
+    shm = SharedMemory(create=True, size=max(1, len(data)))
+    shm.buf[: len(data)] = data
+    return shm
+
+
+def _release(shm):
+    shm.close()
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+
+
+# A raw buffer held in shared memory for the length of a batch, so its jobs
+# attach to it by name instead of each copying it in. Nothing long-lived
+# should be kept in one: /dev/shm may be small. The segment is unlinked when
+# the ShmBuf is garbage collected.
+class ShmBuf:
+    __slots__ = ("shm", "size", "_fin", "__weakref__")
+
+    def __init__(self, shm, size):
+        self.shm = shm
+        self.size = size
+        self._fin = finalize(self, _release, shm)
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls(_to_shm(data), len(data))
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def buf(self):
+        return self.shm.buf[: self.size]
+
+    def __len__(self):
+        return self.size
+
+    def close(self):
+        self._fin()
+
+
+# What a job returns in place of a large buffer; run() copies it out to the
+# heap and unlinks the segment.
+class ShmRef:
+    __slots__ = ("name", "size")
+
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+
+
+# Called inside a job to hand a large result back through shared memory
+# rather than pickling it through the pool's pipe; falls back to returning
+# the bytes when shared memory is short.
+def to_shm(data):
+    if not _shm_fits(len(data)):
+        return data
+    shm = _to_shm(data)
+    ref = ShmRef(shm.name, len(data))
+    shm.close()
+    return ref
+
+
+def _attach(res):
+    if isinstance(res, ShmRef):
+        shm = SharedMemory(name=res.name)
+        try:
+            return bytes(shm.buf[: res.size])
+        finally:
+            _release(shm)
+    if isinstance(res, tuple):
+        return tuple(_attach(r) for r in res)
+    return res
+
+
+# metas holds (shm name, size) per input, or the bytes themselves for
+# inputs that didn't fit in shared memory.
+def _shm_call(func, metas, kwargs):
+    st = perf_counter()
+    shms = [SharedMemory(name=m[0]) if isinstance(m, tuple) else None for m in metas]
+    views = [
+        shm.buf[: m[1]] if shm is not None else m for shm, m in zip(shms, metas)
+    ]
+    try:
+        return func(*views, **kwargs), perf_counter() - st
+    finally:
+        for v, shm in zip(views, shms):
+            if shm is not None:
+                v.release()
+                shm.close()
+
+
+_PRELOAD = ["echobotz.helper.overlay", "echobotz.helper.utils.tgimg"]
+
+
+# Pillow work runs in its own processes so it neither holds the GIL nor
+# competes with executor threads. Inputs travel through shared memory rather
+# than being pickled (ShmBuf inputs are passed as-is), as do results a job
+# wraps with to_shm(); either side falls back to pickling when /dev/shm is
+# short. The semaphore bounds queued + running jobs.
+class EchoImgPool:
+    _pool: ProcessPoolExecutor | None = None
+    _sem: Semaphore | None = None
+    jobs = 0
+    waiting = 0
+    running = 0
+    shed = 0
+
+    @classmethod
+    def _get_pool(cls):
+        if cls._pool is None:
+            # forkserver, not fork: by now motor and executor threads exist
+            # and forking them can deadlock on a held lock. Workers come
+            # from a clean server with the image modules preloaded; the
+            # bot's own __main__ is never re-run (started with -m).
+            ctx = get_context("forkserver")
+            ctx.set_forkserver_preload(_PRELOAD)
+            cls._pool = ProcessPoolExecutor(
+                max_workers=Config.IMG_WORKERS, mp_context=ctx
+            )
+            LOGGER.info(f"EchoImgPool started with {Config.IMG_WORKERS} workers")
+        return cls._pool
+
+    # Checked by image commands before they download anything; when true the
+    # request is turned away (and counted) instead of queueing past IMG_QUEUE.
+    @classmethod
+    def busy(cls):
+        if cls.waiting + cls.running < Config.IMG_QUEUE:
+            return False
+        cls.shed += 1
+        return True
+
+    @classmethod
+    async def run(cls, func, *blobs, **kwargs):
+        if cls._sem is None:
+            cls._sem = Semaphore(Config.IMG_QUEUE)
+        st = monotonic()
+        cls.waiting += 1
+        try:
+            await cls._sem.acquire()
+        finally:
+            cls.waiting -= 1
+        wait = monotonic() - st
+        cls.running += 1
+        temp = []
+        metas = []
+        for b in blobs:
+            if not isinstance(b, ShmBuf) and _shm_fits(len(b)):
+                b = ShmBuf.from_bytes(b)
+                temp.append(b)
+            if isinstance(b, ShmBuf):
+                metas.append((b.name, b.size))
+            else:
+                metas.append(b if isinstance(b, bytes) else bytes(b))
+        try:
+            res, took = await get_running_loop().run_in_executor(
+                cls._get_pool(),
+                _shm_call,
+                func,
+                metas,
+                kwargs,
+            )
+            res = _attach(res)
+        finally:
+            for b in temp:
+                b.close()
+            cls.running -= 1
+            cls._sem.release()
+        cls.jobs += 1
+        LOGGER.info(
+            f"IMG {func.__name__}: wait {wait * 1000:.0f}ms, run {took * 1000:.0f}ms"
+        )
+        return res
+
+    @classmethod
+    def shutdown(cls):
+        if cls._pool is not None:
+            cls._pool.shutdown(wait=False, cancel_futures=True)
+            cls._pool = None
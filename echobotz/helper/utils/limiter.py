@@ -0,0 +1,43 @@
+from asyncio import Lock, sleep
+from time import monotonic
+
+
+# Shared token bucket. penalize() pauses every caller for a FloodWait and cuts
+# the rate; reward() creeps it back up to max_rate after successful calls.
+class TokenBucket:
+    def __init__(self, rate, burst=None, min_rate=1.0):
+        self.max_rate = float(rate)
+        self.min_rate = float(min_rate)
+        self.rate = self.max_rate
+        self.capacity = float(burst or rate)
+        self.tokens = self.capacity
+        self.floods = 0
+        self._ts = monotonic()
+        self._paused_until = 0.0
+        self._lock = Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = monotonic()
+                if now < self._paused_until:
+                    await sleep(self._paused_until - now)
+                    continue
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self._ts) * self.rate
+                )
+                self._ts = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await sleep((1 - self.tokens) / self.rate)
+
+    def penalize(self, wait):
+        self.floods += 1
+        self._paused_until = max(self._paused_until, monotonic() + wait)
+        self.rate = max(self.min_rate, self.rate * 0.7)
+        self.tokens = 0
+
+    def reward(self):
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + 0.05)
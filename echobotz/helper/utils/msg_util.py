@@ -1,4 +1,5 @@
 from asyncio import sleep, gather
+from io import BytesIO
 from pyrogram.types import Message
 from pyrogram.errors import (
     FloodWait,
@@ -9,6 +10,8 @@ from pyrogram.errors import (
     WebpageCurlFailed,
     MediaEmpty,
     MediaCaptionTooLong,
+    FileIdInvalid,
+    FileReferenceExpired,
 )
 
 try:
@@ -18,6 +21,50 @@ except ImportError:
 
 from ...core.EchoClient import EchoBot, ParseMode
 from ... import LOGGER
+from .db import database
+from .tgimg import tg_image
+
+
+async def _send_cached(chat_id, key, **kwargs):
+    fid = await database._get_file_id(key)
+    if not fid:
+        return None
+    try:
+        return await EchoBot.bot.send_photo(chat_id=chat_id, photo=fid, **kwargs)
+    except (FileIdInvalid, FileReferenceExpired, MediaEmpty):
+        LOGGER.warning(f"Cached file_id rejected for {key}")
+        await database._rm_file_id(key)
+
+
+# URLs are fetched and fitted to Telegram's photo limits locally, then
+# uploaded as bytes; file_ids are cached by both URL and content hash so
+# mirrors of the same image share one upload.
+async def send_photo(chat_id, photo, **kwargs):
+    url = (
+        photo
+        if isinstance(photo, str) and photo.startswith(("http://", "https://"))
+        else None
+    )
+    if not url:
+        return await EchoBot.bot.send_photo(chat_id=chat_id, photo=photo, **kwargs)
+
+    sent = await _send_cached(chat_id, url, **kwargs)
+    if sent:
+        return sent
+    keys = [url]
+    img = await tg_image(url)
+    if img:
+        key, data = img
+        keys.append(key)
+        sent = await _send_cached(chat_id, key, **kwargs)
+        photo = BytesIO(data)
+        photo.name = "photo.jpg"
+    if not sent:
+        sent = await EchoBot.bot.send_photo(chat_id=chat_id, photo=photo, **kwargs)
+    if getattr(sent, "photo", None):
+        for k in keys:
+            await database._set_file_id(k, sent.photo.file_id)
+    return sent
 
 
 async def send_message(message, text, buttons=None, block=True, photo=None, **kwargs):
@@ -28,19 +75,20 @@ async def send_message(message, text, buttons=None, block=True, photo=None, **kw
         if photo:
             try:
                 if isinstance(message, int):
-                    return await EchoBot.bot.send_photo(
-                        chat_id=message,
-                        photo=photo,
+                    return await send_photo(
+                        message,
+                        photo,
                         caption=text,
                         reply_markup=buttons,
                         disable_notification=disable_notification,
                         **kwargs,
                     )
-                return await message.reply_photo(
-                    photo=photo,
+                return await send_photo(
+                    message.chat.id,
+                    photo,
                     caption=text,
                     reply_markup=buttons,
-                    quote=True,
+                    reply_to_message_id=message.id,
                     disable_notification=disable_notification,
                     **kwargs,
                 )
@@ -140,6 +188,20 @@ async def edit_reply_markup(message, buttons):
         return str(e)
 
 
+async def edit_media(message, media, buttons=None):
+    try:
+        return await message.edit_media(media=media, reply_markup=buttons)
+    except MessageNotModified:
+        pass
+    except (FloodWait, FloodPremiumWait) as f:
+        LOGGER.warning(str(f))
+        await sleep(f.value * 1.2)
+        return await edit_media(message, media, buttons)
+    except Exception as e:
+        LOGGER.error(str(e), exc_info=True)
+        return str(e)
+
+
 async def send_file(message, file, caption="", buttons=None, **kwargs):
     try:
         if isinstance(message, int):
@@ -168,6 +230,22 @@ async def send_file(message, file, caption="", buttons=None, **kwargs):
         return str(e)
 
 
+async def send_media_group(message, media):
+    try:
+        return await message.reply_media_group(
+            media=media,
+            quote=True,
+            disable_notification=True,
+        )
+    except (FloodWait, FloodPremiumWait) as f:
+        LOGGER.warning(str(f))
+        await sleep(f.value * 1.2)
+        return await send_media_group(message, media)
+    except Exception as e:
+        LOGGER.error(str(e), exc_info=True)
+        return str(e)
+
+
 async def delete_message(*args):
     tasks = [msg.delete() for msg in args if isinstance(msg, Message)]
     if not tasks:
@@ -0,0 +1,126 @@
+from asyncio import Lock, Semaphore
+from json import loads
+from urllib.parse import urlparse
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+
+from config import Config
+from ... import LOGGER
+
+_TIMEOUTS = {
+    "default": 20,
+    "tmdb": 15,
+    "anilist": 10,
+    "ott": 15,
+    "bypass": 30,
+    "image": 20,
+}
+
+_UA = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+
+
+class HTTPError(Exception):
+    def __init__(self, status, url, msg=""):
+        self.status = status
+        self.url = url
+        super().__init__(msg or f"HTTP {status} for {url}")
+
+
+class EchoResponse:
+    __slots__ = ("status", "headers", "url", "content")
+
+    def __init__(self, status, headers, url, content):
+        self.status = status
+        self.headers = headers
+        self.url = url
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return loads(self.content)
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise HTTPError(self.status, self.url)
+
+
+class EchoHTTP:
+    _lock = Lock()
+    _session: ClientSession | None = None
+    _hosts = {}
+
+    @classmethod
+    async def _get_session(cls):
+        if cls._session is not None and not cls._session.closed:
+            return cls._session
+        async with cls._lock:
+            if cls._session is None or cls._session.closed:
+                conn = TCPConnector(
+                    limit=Config.HTTP_POOL_SIZE,
+                    limit_per_host=Config.HTTP_PER_HOST,
+                    ttl_dns_cache=300,
+                    keepalive_timeout=60,
+                )
+                cls._session = ClientSession(
+                    connector=conn,
+                    headers={"User-Agent": _UA},
+                )
+                LOGGER.info("EchoHTTP session created")
+        return cls._session
+
+    @classmethod
+    def _bulkhead(cls, url):
+        host = urlparse(url).netloc.lower()
+        sem = cls._hosts.get(host)
+        if sem is None:
+            sem = cls._hosts[host] = Semaphore(Config.HTTP_PER_HOST)
+        return sem
+
+    @classmethod
+    async def request(
+        cls, method, url, svc="default", max_bytes=None, content_types=None, **kwargs
+    ):
+        session = await cls._get_session()
+        timeout = ClientTimeout(total=_TIMEOUTS.get(svc, _TIMEOUTS["default"]))
+        async with cls._bulkhead(url):
+            async with session.request(method, url, timeout=timeout, **kwargs) as resp:
+                if content_types and resp.status < 400:
+                    ctype = resp.headers.get("Content-Type", "").lower()
+                    if not ctype.startswith(tuple(content_types)):
+                        raise HTTPError(
+                            resp.status, url, f"Unexpected Content-Type {ctype or 'none'}"
+                        )
+                if max_bytes is None:
+                    body = await resp.read()
+                else:
+                    if (resp.content_length or 0) > max_bytes:
+                        raise HTTPError(
+                            resp.status, url, f"Body exceeds {max_bytes} bytes"
+                        )
+                    body = bytearray()
+                    async for chunk in resp.content.iter_chunked(65536):
+                        body += chunk
+                        if len(body) > max_bytes:
+                            raise HTTPError(
+                                resp.status, url, f"Body exceeds {max_bytes} bytes"
+                            )
+                return EchoResponse(resp.status, resp.headers, str(resp.url), body)
+
+    @classmethod
+    async def get(cls, url, svc="default", **kwargs):
+        return await cls.request("GET", url, svc, **kwargs)
+
+    @classmethod
+    async def post(cls, url, svc="default", **kwargs):
+        return await cls.request("POST", url, svc, **kwargs)
+
+    @classmethod
+    async def close(cls):
+        async with cls._lock:
+            if cls._session is not None and not cls._session.closed:
+                await cls._session.close()
+                LOGGER.info("EchoHTTP session closed")
+            cls._session = None
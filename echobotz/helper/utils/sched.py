@@ -0,0 +1,151 @@
+from asyncio import Semaphore, current_task, get_running_loop, wait
+from functools import wraps
+
+from pyrogram.types import CallbackQuery, Message
+
+from config import Config
+from ... import LOGGER
+
+_BUSY = "Busy right now, try again in a moment."
+_CLOSING = "Restarting, try again in a moment."
+
+
+class _Lane:
+    __slots__ = ("name", "limit", "queue", "sem", "running", "waiting", "done", "shed", "peak")
+
+    def __init__(self, name, limit, queue):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.sem = Semaphore(limit) if limit else None
+        self.running = 0
+        self.waiting = 0
+        self.done = 0
+        self.shed = 0
+        self.peak = 0
+
+    def stats(self):
+        return {
+            "running": self.running,
+            "waiting": self.waiting,
+            "limit": self.limit or "none",
+            "peak_waiting": self.peak,
+            "done": self.done,
+            "shed": self.shed,
+        }
+
+
+# Handler tasks run in named lanes. Each lane caps how many run at once and
+# how many may wait; past that the update gets a "busy" reply instead of
+# another coroutine. The owner lane has no cap so admin commands never queue
+# behind user traffic. Every task is referenced until it finishes, so drain()
+# can stop intake and wait for in-flight work before a stop or restart.
+class EchoSched:
+    lanes = {
+        "owner": _Lane("owner", 0, 0),
+        "search": _Lane("search", Config.TASK_SEARCH, Config.TASK_QUEUE),
+        "bypass": _Lane("bypass", Config.TASK_BYPASS, Config.TASK_QUEUE),
+        "image": _Lane("image", Config.TASK_IMAGE, Config.TASK_QUEUE),
+        "default": _Lane("default", Config.TASK_DEFAULT, Config.TASK_QUEUE),
+    }
+    tasks = set()
+    resumable = set()
+    closing = False
+
+    @classmethod
+    def task(cls, lane="default"):
+        if callable(lane):
+            return cls.task()(lane)
+
+        def deco(func):
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                return await cls.submit(lane, func, *args, **kwargs)
+
+            return wrapper
+
+        return deco
+
+    @classmethod
+    async def submit(cls, name, func, *args, **kwargs):
+        lane = cls.lanes[name]
+        if cls.closing:
+            await cls._busy(args, _CLOSING)
+            return None
+        if lane.queue and lane.waiting + lane.running >= lane.limit + lane.queue:
+            lane.shed += 1
+            LOGGER.warning(f"Lane {name} full, shedding {func.__name__}")
+            await cls._busy(args)
+            return None
+        lane.waiting += 1
+        lane.peak = max(lane.peak, lane.waiting)
+        return cls.spawn(cls._run(lane, func, args, kwargs))
+
+    @classmethod
+    def spawn(cls, coro):
+        t = get_running_loop().create_task(coro)
+        cls.tasks.add(t)
+        t.add_done_callback(cls.tasks.discard)
+        return t
+
+    # Marks the running task as safe to cancel on drain: it checkpoints on
+    # CancelledError and picks up again after the restart.
+    @classmethod
+    def mark_resumable(cls):
+        t = current_task()
+        cls.resumable.add(t)
+        t.add_done_callback(cls.resumable.discard)
+
+    @staticmethod
+    async def _run(lane, func, args, kwargs):
+        try:
+            if lane.sem:
+                await lane.sem.acquire()
+        finally:
+            lane.waiting -= 1
+        lane.running += 1
+        try:
+            return await func(*args, **kwargs)
+        except Exception as e:
+            LOGGER.error(f"{func.__name__} error: {e}", exc_info=True)
+        finally:
+            lane.running -= 1
+            lane.done += 1
+            if lane.sem:
+                lane.sem.release()
+
+    @staticmethod
+    async def _busy(args, text=_BUSY):
+        update = args[1] if len(args) > 1 else None
+        try:
+            if isinstance(update, CallbackQuery):
+                await update.answer(text, show_alert=True)
+            elif isinstance(update, Message):
+                await update.reply(f"<i>{text}</i>", quote=True)
+        except Exception as e:
+            LOGGER.error(f"Busy reply failed: {e}")
+
+    @classmethod
+    async def drain(cls, timeout=None):
+        cls.closing = True
+        timeout = Config.DRAIN_TIMEOUT if timeout is None else timeout
+        me = current_task()
+        tasks = [t for t in cls.tasks if t is not me]
+        if not tasks:
+            return
+        for t in tasks:
+            if t in cls.resumable:
+                t.cancel()
+        LOGGER.info(
+            f"Draining {len(tasks)} tasks ({len(cls.resumable)} resumable), deadline {timeout}s"
+        )
+        done, pending = await wait(tasks, timeout=timeout)
+        for t in pending:
+            t.cancel()
+        if pending:
+            await wait(pending, timeout=5)
+        LOGGER.info(f"Drained: {len(done)} finished, {len(pending)} cancelled")
+
+    @classmethod
+    def stats(cls):
+        return {name: lane.stats() for name, lane in cls.lanes.items()}
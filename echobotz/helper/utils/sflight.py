@@ -0,0 +1,47 @@
+from asyncio import CancelledError, ensure_future, shield
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+# Collapses concurrent calls with the same key onto one upstream task.
+# A waiter being cancelled never cancels the shared task unless it was the
+# last one still waiting on it.
+class SingleFlight:
+    def __init__(self, name):
+        self.name = name
+        self.shared = 0
+        self._calls = {}
+
+    def __len__(self):
+        return len(self._calls)
+
+    async def do(self, key, func, *args, **kwargs):
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(ensure_future(func(*args, **kwargs)))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda t, k=key, c=call: self._done(k, c, t))
+        else:
+            self.shared += 1
+
+        call.waiters += 1
+        try:
+            return await shield(call.task)
+        except CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _done(self, key, call, task):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,101 @@
+from hashlib import sha256
+from io import BytesIO
+
+from config import Config
+from ... import LOGGER
+from .cache import EchoCache
+from .imgpool import EchoImgPool
+from .net import EchoHTTP
+from .sflight import SingleFlight
+
+try:
+    from PIL import Image
+except Exception as e:
+    Image = None
+    LOGGER.error(f"{e}")
+
+IMG_TYPES = ("image/", "application/octet-stream", "binary/octet-stream")
+
+# Telegram rejects photos above 10 MB or with a side ratio over 20
+_MAX_RATIO = 20
+
+TG_IMG_CACHE = EchoCache(
+    "tg_img",
+    ttl=86400,
+    maxsize=512,
+    max_bytes=Config.TG_IMG_CACHE_MB * 1024 * 1024,
+)
+TG_IMG_FLIGHT = SingleFlight("tg_img")
+
+
+def _tg_fit(data, max_side, max_bytes):
+    im = Image.open(BytesIO(data))
+    w, h = im.size
+    ok_ratio = max(w, h) <= _MAX_RATIO * min(w, h)
+    if (
+        im.format == "JPEG"
+        and im.mode in ("RGB", "L")
+        and len(data) <= max_bytes
+        and max(w, h) <= max_side
+        and ok_ratio
+    ):
+        return None
+
+    im.draft("RGB", (max_side, max_side))
+    if im.mode in ("RGBA", "LA", "P"):
+        im = im.convert("RGBA")
+        bg = Image.new("RGB", im.size, (255, 255, 255))
+        bg.paste(im, mask=im.getchannel("A"))
+        im = bg
+    else:
+        im = im.convert("RGB")
+    im.thumbnail((max_side, max_side), Image.LANCZOS, reducing_gap=3.0)
+
+    if not ok_ratio:
+        w, h = im.size
+        cw, ch = max(w, -(-h // _MAX_RATIO)), max(h, -(-w // _MAX_RATIO))
+        bg = Image.new("RGB", (cw, ch), (0, 0, 0))
+        bg.paste(im, ((cw - w) // 2, (ch - h) // 2))
+        im = bg
+
+    while True:
+        for q in (88, 80, 72, 64):
+            out = BytesIO()
+            im.save(out, format="JPEG", quality=q, optimize=True, progressive=True)
+            if out.tell() <= max_bytes:
+                return out.getvalue()
+        im = im.reduce(2)
+
+
+async def _tg_image(url):
+    r = await EchoHTTP.get(
+        url,
+        "image",
+        max_bytes=Config.OVERLAP_MAX_MB * 1024 * 1024,
+        content_types=IMG_TYPES,
+    )
+    r.raise_for_status()
+    key = "img:" + sha256(r.content).hexdigest()[:32]
+    data = TG_IMG_CACHE.get(key)
+    if data is None:
+        data = await EchoImgPool.run(
+            _tg_fit,
+            r.content,
+            max_side=Config.TG_PHOTO_MAX_PX,
+            max_bytes=Config.TG_PHOTO_MAX_KB * 1024,
+        )
+        data = data or bytes(r.content)
+        TG_IMG_CACHE.set(key, data, len(data))
+    return key, data
+
+
+# Fetches url and returns (content hash key, Telegram-safe JPEG bytes), or
+# None when it can't be fetched/decoded and the url should be sent as is.
+async def tg_image(url):
+    if Image is None:
+        return None
+    try:
+        return await TG_IMG_FLIGHT.do(url, _tg_image, url)
+    except Exception as e:
+        LOGGER.error(f"tg_image failed for {url}: {e}")
+        return None
@@ -1,6 +1,6 @@
-import asyncio
-from functools import partial, wraps 
 from ... import user_data
+from .execs import EchoExec
+from .sched import EchoSched
 
 def _update_user_ldata(user_id: int, key: str, value):
     data = user_data.get(user_id)
@@ -33,10 +33,16 @@ def _get_readable_time(seconds: int) -> str:
     return " ".join(time_list)
 
 
+def _get_readable_bytes(size) -> str:
+    size = float(size or 0)
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.2f} {unit}" if unit != "B" else f"{int(size)} B"
+        size /= 1024
+
+
 async def _sync_to_async(func, *args, **kwargs):
-    loop = asyncio.get_running_loop()
-    pfunc = partial(func, *args, **kwargs)
-    return await loop.run_in_executor(None, pfunc)
+    return await EchoExec.run("default", func, *args, **kwargs)
 
 def safe_int(value, default=0):
     try:
@@ -45,11 +51,5 @@ def safe_int(value, default=0):
         return default
 
 
-def _task(func):
-    @wraps(func)
-    async def wrapper(*args, **kwargs):
-        loop = asyncio.get_running_loop()
-        task = loop.create_task(func(*args, **kwargs))
-        return task
-
-    return wrapper
+# @_task runs a handler in the default lane, @_task("lane") in a named one
+_task = EchoSched.task
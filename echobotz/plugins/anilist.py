@@ -1,10 +1,9 @@
 from pyrogram.errors import MediaEmpty, PhotoInvalidDimensions, WebpageMediaEmpty
 
 from config import Config
-from ..core.EchoClient import EchoBot
 from ..helper.utils.btns import EchoButtons
-from ..helper.utils.msg_util import send_message, edit_message, delete_message
-from ..helper.utils.xtra import _get_readable_time, _sync_to_async, _task
+from ..helper.utils.msg_util import send_message, send_photo, edit_message, delete_message
+from ..helper.utils.xtra import _get_readable_time, _task
 from ..helper.anilist_api import _search, _get
 
 
@@ -154,7 +153,7 @@ def _links(info):
         ext = "".join(parts)
     return mal, ext
 
-@_task
+@_task("search")
 async def _anime(client, message):
     if " " not in message.text:
         return await send_message(
@@ -168,7 +167,7 @@ async def _anime(client, message):
     btn = EchoButtons()
 
     try:
-        res = await _sync_to_async(_search, q)
+        res = await _search(q)
     except Exception:
         return await edit_message(k, "<i>Something went wrong while searching.</i>")
 
@@ -194,7 +193,7 @@ async def _anime(client, message):
         btn.build(1),
     )
 
-@_task
+@_task("search")
 async def _anime_cb(client, query):
     message = query.message
     user_id = query.from_user.id
@@ -208,7 +207,7 @@ async def _anime_cb(client, query):
         aid = int(data[3])
 
         try:
-            info = await _sync_to_async(_get, aid)
+            info = await _get(aid)
         except Exception:
             return await query.answer("Failed to fetch details.", show_alert=True)
 
@@ -291,9 +290,9 @@ async def _anime_cb(client, query):
         target_msg = message.reply_to_message or message
 
         try:
-            await EchoBot.bot.send_photo(
-                chat_id=target_msg.chat.id,
-                photo=cover,
+            await send_photo(
+                target_msg.chat.id,
+                cover,
                 caption=cap,
                 reply_to_message_id=target_msg.id,
                 reply_markup=kb,
@@ -1,95 +1,266 @@
-from asyncio import sleep
-from time import time
+from asyncio import CancelledError
+from collections import deque
 from secrets import token_hex
+from time import time
 
-from pyrogram.errors import FloodWait, InputUserDeactivated, UserIsBlocked
+from pyrogram.errors import InputUserDeactivated, UserIsBlocked
 
 from config import Config
+from .. import LOGGER
 from ..core.EchoClient import EchoBot
+from ..helper.bcast import EchoSender, SendStats
 from ..helper.utils.db import database
 from ..helper.utils.msg_util import send_message, edit_message
+from ..helper.utils.sched import EchoSched
 from ..helper.utils.xtra import _get_readable_time, _task
 
 bc_cache = {}
 
-async def _delete_broadcast(bc_id, message):
+BC_STATUS = """╭ <b><i>Broadcast Stats :</i></b>
+╞╴<b>Total Users:</b> <code>{t}</code>
+╞╴<b>Success:</b> <code>{s}</code>
+╞╴<b>Blocked Users:</b> <code>{b}</code>
+╞╴<b>Deleted Accounts:</b> <code>{d}</code>
+╞╴<b>Unsuccess Attempt:</b> <code>{u}</code>
+╞╴<b>Speed:</b> <code>{sp:.1f} msg/s</code>
+╰ <b>ETA:</b> <code>{eta}</code>"""
+
+
+def _status(st):
+    return BC_STATUS.format(
+        t=st.done,
+        s=st.get("s"),
+        b=st.get("b"),
+        d=st.get("d"),
+        u=st.get("u"),
+        sp=st.speed,
+        eta=st.eta,
+    )
+
+
+async def _bc_msgs(bc_id):
     if bc_id not in bc_cache:
+        if not await database._get_broadcast(bc_id):
+            return None
+        bc_cache[bc_id] = await database._get_broadcast_msgs(bc_id)
+    return bc_cache[bc_id]
+
+
+# Tracks a contiguous low watermark over the uid-sorted recipient stream, so
+# last_uid is only advanced once every earlier uid has been handled. Uids
+# past it whose send has begun are saved as "inflight" and skipped on
+# resume: they may already have the message (a worker cancelled mid-send)
+# and are already in the saved counts.
+class _Checkpoint:
+    def __init__(self, bc_id, last_uid=None, msgs=None, inflight=None):
+        self.bc_id = bc_id
+        self.last_uid = last_uid
+        self.msgs = list(msgs or [])
+        self.sent = {uid for uid, _ in self.msgs}
+        self.inflight = set(inflight or ())
+        self._skip = self.sent | self.inflight
+        self._buf = []
+        self._pending = deque()
+        self._done = set()
+
+    async def recipients(self):
+        async for uid in database._iter_pm_uids(after=self.last_uid):
+            if uid in self._skip:
+                continue
+            self._pending.append(uid)
+            yield uid
+
+    def begin(self, uid):
+        self.inflight.add(uid)
+
+    def add_msg(self, uid, msg_id):
+        self.msgs.append((uid, msg_id))
+        self._buf.append((uid, msg_id))
+
+    def finished(self, uid, res):
+        self._done.add(uid)
+        while self._pending and self._pending[0] in self._done:
+            self.last_uid = self._pending.popleft()
+            self._done.discard(self.last_uid)
+            self.inflight.discard(self.last_uid)
+
+    async def flush(self, stats, status="running"):
+        if self.last_uid is not None:
+            self.inflight = {u for u in self.inflight if u > self.last_uid}
+        buf, self._buf = self._buf, []
+        await database._push_broadcast_msgs(self.bc_id, buf)
+        await database._save_broadcast(
+            self.bc_id,
+            {
+                "status": status,
+                "last_uid": self.last_uid,
+                "inflight": list(self.inflight),
+                "done": stats.done,
+                "counts": stats.counts,
+            },
+        )
+
+
+async def _run_broadcast(bc_id, rply, forwarded, quietly, pls_wait, ck, stats):
+    bc_cache[bc_id] = ck.msgs
+
+    async def _job(uid):
+        ck.begin(uid)
+        try:
+            if forwarded:
+                bc_msg = await rply.forward(uid, disable_notification=quietly)
+            else:
+                bc_msg = await rply.copy(uid, disable_notification=quietly)
+        except UserIsBlocked:
+            await database._rm_pm_user(uid)
+            return "b"
+        except InputUserDeactivated:
+            await database._rm_pm_user(uid)
+            return "d"
+        if bc_msg:
+            ck.add_msg(uid, bc_msg.id)
+        return "s"
+
+    async def _progress(st):
+        await ck.flush(st)
+        await edit_message(pls_wait, _status(st))
+
+    EchoSched.mark_resumable()
+    try:
+        await EchoSender().run(ck.recipients(), _job, stats, _progress, ck.finished)
+    except CancelledError:
+        await ck.flush(stats)
+        await edit_message(
+            pls_wait,
+            f"{_status(stats)}\n\n<i>Paused for restart, it resumes automatically.</i>",
+        )
+        LOGGER.info(f"Broadcast {bc_id} checkpointed at uid {ck.last_uid}")
+        raise
+    await ck.flush(stats, "done")
+    return await edit_message(
+        pls_wait,
+        f"{_status(stats)}\n\n<b>Elapsed Time:</b> <code>{_get_readable_time(stats.elapsed)}</code>\n<b>Broadcast ID:</b> <code>{bc_id}</code>",
+    )
+
+
+async def _resume_broadcasts():
+    for doc in await database._get_running_broadcasts():
+        bc_id = doc["_id"]
+        try:
+            rply = await EchoBot.bot.get_messages(doc["src_chat"], doc["src_msg"])
+            pls_wait = await EchoBot.bot.get_messages(
+                doc["status_chat"], doc["status_msg"]
+            )
+        except Exception as e:
+            LOGGER.error(f"Broadcast {bc_id} can't be resumed: {e}")
+            await database._save_broadcast(bc_id, {"status": "failed"})
+            continue
+        if not rply or getattr(rply, "empty", False):
+            await database._save_broadcast(bc_id, {"status": "failed"})
+            continue
+        LOGGER.info(f"Resuming broadcast {bc_id} after uid {doc.get('last_uid')}")
+        ck = _Checkpoint(
+            bc_id,
+            doc.get("last_uid"),
+            await database._get_broadcast_msgs(bc_id),
+            doc.get("inflight"),
+        )
+        stats = SendStats(
+            await database._count_pm_users(), doc.get("done", 0), doc.get("counts")
+        )
+        await _run_broadcast(
+            bc_id,
+            rply,
+            doc.get("forwarded", False),
+            doc.get("quietly", False),
+            pls_wait,
+            ck,
+            stats,
+        )
+
+
+async def _delete_broadcast(bc_id, message):
+    msgs = await _bc_msgs(bc_id)
+    if msgs is None:
         return await send_message(message, "Invalid Broadcast ID!")
     tmp = await send_message(
         message, "<i>Deleting the Broadcasted Message! Please Wait ...</i>"
     )
-    total, success, failed = 0, 0, 0
-    msgs = bc_cache.get(bc_id, [])
+    chats = {}
     for uid, msg_id in msgs:
-        bc_msg = None
-        try:
-            bc_msg = await EchoBot.get_messages(uid, msg_id)
-            await bc_msg.delete()
-            success += 1
-        except FloodWait as e:
-            await sleep(e.value)
-            if not bc_msg:
-                bc_msg = await EchoBot.get_messages(uid, msg_id)
-            await bc_msg.delete()
-            success += 1
-        except Exception:
-            failed += 1
-        total += 1
-    return await edit_message(
-        tmp,
-        f"""╭ <b><i>Broadcast Deleted Stats :</i></b>
-╞╴<b>Total Users:</b> <code>{total}</code>
-╞╴<b>Success:</b> <code>{success}</code>
-╰ <b>Failed Attempts:</b> <code>{failed}</code>
+        chats.setdefault(uid, []).append(msg_id)
+    stats = SendStats(len(chats))
 
-<b>Broadcast ID:</b> <code>{bc_id}</code>""",
-    )
+    async def _job(item):
+        uid, ids = item
+        return "s" if await EchoBot.bot.delete_messages(uid, ids) else "u"
+
+    async def _progress(st):
+        await edit_message(tmp, _op_status("Deleting", st, bc_id))
+
+    await EchoSender().run(chats.items(), _job, stats, _progress)
+    return await edit_message(tmp, _op_status("Deleted", stats, bc_id))
 
 
 async def _edit_broadcast(bc_id, message, rply):
-    if bc_id not in bc_cache:
+    msgs = await _bc_msgs(bc_id)
+    if msgs is None:
         return await send_message(message, "Invalid Broadcast ID!")
+    doc = await database._get_broadcast(bc_id)
+    if doc is not None:
+        forwarded = doc.get("forwarded", False)
+    elif msgs:
+        first = await EchoBot.bot.get_messages(*msgs[0])
+        forwarded = bool(getattr(first, "forward_date", None))
+    else:
+        forwarded = False
+    if forwarded:
+        return await send_message(
+            message,
+            "<i>Forwarded Messages can't be Edited, Only can be Deleted!</i>",
+        )
     tmp = await send_message(
         message, "<i>Editing the Broadcasted Message! Please Wait ...</i>"
     )
-    total, success, failed = 0, 0, 0
-    for uid, msg_id in bc_cache[bc_id]:
-        msg = await EchoBot.get_messages(uid, msg_id)
-        if getattr(msg, "forward_from", None):
-            return await edit_message(
-                tmp,
-                "<i>Forwarded Messages can't be Edited, Only can be Deleted!</i>",
-            )
-        try:
-            await msg.edit(
-                text=rply.text,
+    stats = SendStats(len(msgs))
+
+    async def _job(item):
+        uid, msg_id = item
+        if rply.text:
+            await EchoBot.bot.edit_message_text(
+                uid,
+                msg_id,
+                rply.text,
                 entities=rply.entities,
                 reply_markup=rply.reply_markup,
             )
-            await sleep(0.3)
-            success += 1
-        except FloodWait as e:
-            await sleep(e.value)
-            await msg.edit(
-                text=rply.text,
-                entities=rply.entities,
+        else:
+            await EchoBot.bot.edit_message_caption(
+                uid,
+                msg_id,
+                rply.caption or "",
+                caption_entities=rply.caption_entities,
                 reply_markup=rply.reply_markup,
             )
-            success += 1
-        except Exception:
-            failed += 1
-        total += 1
-    return await edit_message(
-        tmp,
-        f"""╭ <b><i>Broadcast Edited Stats :</i></b>
-╞╴<b>Total Users:</b> <code>{total}</code>
-╞╴<b>Success:</b> <code>{success}</code>
-╰ <b>Failed Attempts:</b> <code>{failed}</code>
+        return "s"
 
-<b>Broadcast ID:</b> <code>{bc_id}</code>""",
-    )
+    async def _progress(st):
+        await edit_message(tmp, _op_status("Editing", st, bc_id))
+
+    await EchoSender().run(msgs, _job, stats, _progress)
+    return await edit_message(tmp, _op_status("Edited", stats, bc_id))
+
+
+def _op_status(action, st, bc_id):
+    return f"""╭ <b><i>Broadcast {action} Stats :</i></b>
+╞╴<b>Total Users:</b> <code>{st.done}</code>
+╞╴<b>Success:</b> <code>{st.get("s")}</code>
+╞╴<b>Failed Attempts:</b> <code>{st.get("u")}</code>
+╰ <b>Elapsed:</b> <code>{_get_readable_time(st.elapsed) or "0s"}</code>
 
-@_task
+<b>Broadcast ID:</b> <code>{bc_id}</code>"""
+
+@_task("owner")
 async def _broadcast(client, message):
     bc_id, forwarded, quietly, deleted, edited = "", False, False, False, False
     if not Config.DATABASE_URL:
@@ -99,12 +270,12 @@ async def _broadcast(client, message):
     rply = message.reply_to_message
     if len(message.command) > 1:
         if not message.command[1].startswith("-"):
-            if bc_cache.get(message.command[1], False):
+            if await _bc_msgs(message.command[1]) is not None:
                 bc_id = message.command[1]
             else:
                 return await send_message(
                     message,
-                    "<i>Broadcast ID not found! After Restart, you can't edit or delete broadcasted messages...</i>",
+                    "<i>Broadcast ID not found!</i>",
                 )
         for arg in message.command[1:]:
             if arg in ["-f", "-forward"] and rply:
@@ -134,55 +305,30 @@ async def _broadcast(client, message):
 /broadcast broadcast_id -d
 
 <b>Notes:</b>
-1. Broadcast msgs can be only edited or deleted until restart.
+1. Interrupted broadcasts resume automatically after restart.
 2. Forwarded msgs can't be Edited""",
         )
     if deleted:
         return await _delete_broadcast(bc_id, message)
     if edited:
         return await _edit_broadcast(bc_id, message, rply)
-    start_time = time()
-    status = """╭ <b><i>Broadcast Stats :</i></b>
-╞╴<b>Total Users:</b> <code>{t}</code>
-╞╴<b>Success:</b> <code>{s}</code>
-╞╴<b>Blocked Users:</b> <code>{b}</code>
-╞╴<b>Deleted Accounts:</b> <code>{d}</code>
-╰ <b>Unsuccess Attempt:</b> <code>{u}</code>"""
-    updater = time()
-    bc_hash, bc_msgs = token_hex(5), []
-    pls_wait = await send_message(message, status.format(t=0, s=0, b=0, d=0, u=0))
-    t, s, b, d, u = 0, 0, 0, 0, 0
-    for uid in await database._get_pm_uids():
-        bc_msg = None
-        try:
-            if forwarded:
-                bc_msg = await rply.forward(uid, disable_notification=quietly)
-            else:
-                bc_msg = await rply.copy(uid, disable_notification=quietly)
-            s += 1
-        except FloodWait as e:
-            await sleep(e.value * 1.1)
-            if forwarded:
-                bc_msg = await rply.forward(uid, disable_notification=quietly)
-            else:
-                bc_msg = await rply.copy(uid, disable_notification=quietly)
-            s += 1
-        except UserIsBlocked:
-            await database._rm_pm_user(uid)
-            b += 1
-        except InputUserDeactivated:
-            await database._rm_pm_user(uid)
-            d += 1
-        except Exception:
-            u += 1
-        if bc_msg:
-            bc_msgs.append((uid, bc_msg.id))
-        t += 1
-        if (time() - updater) > 10:
-            await edit_message(pls_wait, status.format(t=t, s=s, b=b, d=d, u=u))
-            updater = time()
-    bc_cache[bc_hash] = bc_msgs
-    return await edit_message(
-        pls_wait,
-        f"{status.format(t=t, s=s, b=b, d=d, u=u)}\n\n<b>Elapsed Time:</b> <code>{_get_readable_time(time() - start_time)}</code>\n<b>Broadcast ID:</b> <code>{bc_hash}</code>",
+    bc_hash = token_hex(5)
+    stats = SendStats(await database._count_pm_users())
+    pls_wait = await send_message(message, _status(stats))
+    await database._save_broadcast(
+        bc_hash,
+        {
+            "status": "running",
+            "forwarded": forwarded,
+            "quietly": quietly,
+            "src_chat": rply.chat.id,
+            "src_msg": rply.id,
+            "status_chat": pls_wait.chat.id,
+            "status_msg": pls_wait.id,
+            "last_uid": None,
+            "started": time(),
+        },
+    )
+    await _run_broadcast(
+        bc_hash, rply, forwarded, quietly, pls_wait, _Checkpoint(bc_hash), stats
     )
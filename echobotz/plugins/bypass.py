@@ -43,7 +43,7 @@ def _pack_btns(uid, pid, page, maxp):
     btns.data_button("🚫 Close 🚫", f"bpqh {uid} {pid} close")
     return btns.build(2)
 
-@_task
+@_task("bypass")
 async def _bypass_cmd(client, msg):
     if msg.chat.type not in (ChatType.PRIVATE, ChatType.GROUP, ChatType.SUPERGROUP):
         LOGGER.info("Skip: not private/group/supergroup")
@@ -111,7 +111,7 @@ async def _bypass_cmd(client, msg):
     await edit_message(wait_msg, text, buttons=buttons)
     LOGGER.info("Bypass done and sent to user.")
 
-@_task
+@_task("bypass")
 async def _bypass_hc_pack_cb(client, query):
     try:
         data = query.data.split()
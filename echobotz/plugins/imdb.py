@@ -2,15 +2,14 @@ from contextlib import suppress
 from re import IGNORECASE, findall, search
 
 import cloudscraper  # noqa: F401
-from imdbinfo import search_title, get_movie
 from pycountry import countries as conn
 from pyrogram.errors import MediaEmpty, PhotoInvalidDimensions, WebpageMediaEmpty
 
 from config import Config
-from ..core.EchoClient import EchoBot
 from ..helper.utils.btns import EchoButtons
-from ..helper.utils.msg_util import send_message, edit_message, delete_message
-from ..helper.utils.xtra import _get_readable_time, _sync_to_async, _task
+from ..helper.utils.msg_util import send_message, send_photo, edit_message, delete_message
+from ..helper.imdb_api import _search_title, _get_movie
+from ..helper.utils.xtra import _get_readable_time, _task
 
 IMDB_GENRE_EMOJI = {
     "Action": "🚀",
@@ -44,7 +43,7 @@ IMDB_GENRE_EMOJI = {
 }
 LIST_ITEMS = 4
 
-@_task
+@_task("search")
 async def _imdb_search(client, message):
     if " " in message.text:
         k = await send_message(message, "<i>Searching IMDB ...</i>")
@@ -54,7 +53,7 @@ async def _imdb_search(client, message):
         result = search(r"tt(\d+)", title, IGNORECASE)
         if result:
             movieid = result.group(1)
-            movie = await _sync_to_async(get_movie, movieid)
+            movie = await _get_movie(movieid)
             if movie:
                 buttons.data_button(
                     f"🎬 {movie.title} ({getattr(movie, 'year', 'N/A')})",
@@ -63,7 +62,7 @@ async def _imdb_search(client, message):
             else:
                 return await edit_message(k, "<i>No Results Found</i>")
         else:
-            movies = _get_poster(title, bulk=True)
+            movies = await _get_poster(title, bulk=True)
             if not movies:
                 return await edit_message(
                     k, "<i>No Results Found</i>, Try Again or Use <b>Title ID</b>"
@@ -86,7 +85,7 @@ async def _imdb_search(client, message):
         )
 
 
-def _get_poster(query, bulk=False, id=False, file=None):
+async def _get_poster(query, bulk=False, id=False, file=None):
     if not id:
         query = query.strip().lower()
         title = query
@@ -100,7 +99,7 @@ def _get_poster(query, bulk=False, id=False, file=None):
                 year = _list_to_str(year[:1])
         else:
             year = None
-        movieid = search_title(title.lower()).titles
+        movieid = await _search_title(title)
         if not movieid:
             return None
         if year:
@@ -118,7 +117,9 @@ def _get_poster(query, bulk=False, id=False, file=None):
         movieid = movieid[0].id
     else:
         movieid = query
-    movie = get_movie(movieid)
+    movie = await _get_movie(movieid)
+    if not movie:
+        return None
     if getattr(movie, "release_date", None):
         date = movie.release_date
     elif getattr(movie, "year", None):
@@ -260,7 +261,7 @@ def _list_to_hash(k, flagg=False, emoji=False):
         listing += f"#{ele}, "
     return listing[:-2]
 
-@_task
+@_task("search")
 async def _imdb_callback(client, query):
     message = query.message
     user_id = query.from_user.id
@@ -269,7 +270,9 @@ async def _imdb_callback(client, query):
         return await query.answer("Not Yours!", show_alert=True)
     if data[2] == "movie":
         await query.answer("Processing...")
-        imdb = _get_poster(query=data[3], id=True)
+        imdb = await _get_poster(query=data[3], id=True)
+        if not imdb:
+            return await edit_message(message, "<i>No Results Found</i>")
         buttons = EchoButtons()
         if imdb.get("trailer"):
             if isinstance(imdb["trailer"], list):
@@ -287,9 +290,9 @@ async def _imdb_callback(client, query):
         target_msg = message.reply_to_message
         if imdb.get("poster"):
             try:
-                await EchoBot.bot.send_photo(
-                    chat_id=target_msg.chat.id,
-                    photo=imdb["poster"],
+                await send_photo(
+                    target_msg.chat.id,
+                    imdb["poster"],
                     caption=cap,
                     reply_to_message_id=target_msg.id,
                     reply_markup=kb,
@@ -1,48 +1,45 @@
 import io
 import time
 import hashlib
-import requests
-from functools import partial
-
-from pyrogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup
+from asyncio import gather
+
+from pyrogram.types import (
+    CallbackQuery,
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    InputMediaPhoto,
+)
 from pyrogram.enums import ChatType
 
-from ..helper.utils.msg_util import send_message, edit_message, send_file
-from ..helper.utils.xtra import _sync_to_async, _task
+from ..helper.overlay import (
+    Image,
+    OVER_STORE,
+    POS_MAP,
+    POS_NAME,
+    OverlaySession,
+    render_batch,
+    _zip_files,
+)
+from ..helper.tmdb_helper import _s, _i
+from ..helper.utils.msg_util import (
+    send_message,
+    edit_message,
+    edit_media,
+    edit_reply_markup,
+    delete_message,
+    send_file,
+    send_media_group,
+)
+from ..helper.utils.net import EchoHTTP
+from ..helper.utils.tgimg import IMG_TYPES
+from ..helper.utils.execs import EchoExec
+from ..helper.utils.imgpool import EchoImgPool
+from ..helper.utils.xtra import _task
+from config import Config
 from .. import LOGGER
 from ..eco import echo
 
-try:
-    from PIL import Image
-except Exception as e:
-    Image = None
-    LOGGER.error(f"{e}")
-
-OVER_STORE = {}
-
-POS_MAP = {
-    "tl": ("left", "top"),
-    "t": ("center", "top"),
-    "tr": ("right", "top"),
-    "ml": ("left", "center"),
-    "c": ("center", "center"),
-    "mr": ("right", "center"),
-    "bl": ("left", "bottom"),
-    "b": ("center", "bottom"),
-    "br": ("right", "bottom"),
-}
-
-POS_NAME = {
-    "tl": "Top Left",
-    "t": "Top",
-    "tr": "Top Right",
-    "ml": "Middle Left",
-    "c": "Center",
-    "mr": "Middle Right",
-    "bl": "Bottom Left",
-    "b": "Bottom",
-    "br": "Bottom Right",
-}
+_BUSY = "Image workers are busy, try again in a moment."
 
 def _uid(a, b, s):
     h = hashlib.sha256()
@@ -54,49 +51,21 @@ def _uid(a, b, s):
     h.update(str(time.time()).encode("utf-8"))
     return h.hexdigest()[:18]
 
-def _place_coords(pw, ph, lw, lh, pos):
-    hx = {"left": 0, "center": (pw - lw) // 2, "right": pw - lw}
-    hy = {"top": 0, "center": (ph - lh) // 2, "bottom": ph - lh}
-    return hx[pos[0]], hy[pos[1]]
-
-def _merge_images(pbytes, lbytes, scale_percent, pos_key):
-    if Image is None:
-        raise RuntimeError("Pillow not found")
-
-    im = Image.open(io.BytesIO(pbytes)).convert("RGBA")
-    lg = Image.open(io.BytesIO(lbytes)).convert("RGBA")
-
-    pw, ph = im.size
-    scale = max(1, int(scale_percent))
-
-    tgt_w = max(1, pw * scale // 100)
-    wpercent = tgt_w / float(lg.size[0])
-    tgt_h = int((float(lg.size[1]) * float(wpercent)))
-
-    lg = lg.resize((tgt_w, tgt_h), Image.LANCZOS)
-
-    x, y = _place_coords(pw, ph, lg.size[0], lg.size[1], POS_MAP.get(pos_key, ("center", "center")))
-
-    base = Image.new("RGBA", im.size)
-    base.paste(im, (0, 0))
-    base.alpha_composite(lg, dest=(x, y))
-
-    out = io.BytesIO()
-    base.convert("RGB").save(out, format="JPEG", quality=95)
-    out.seek(0)
-    out.name = "overlap.jpg"
-    return out
-
-def _dl(url):
+async def _dl(url):
     try:
-        r = requests.get(url, timeout=20)
+        r = await EchoHTTP.get(
+            url,
+            "image",
+            max_bytes=Config.OVERLAP_MAX_MB * 1024 * 1024,
+            content_types=IMG_TYPES,
+        )
         r.raise_for_status()
         return r.content
     except Exception as e:
-        LOGGER.error(str(e), exc_info=True)
+        LOGGER.error(f"Overlap download failed for {url}: {e}")
         return None
 
-@_task
+@_task("image")
 async def _olap_cmd(client, message):
     if Image is None:
         return await send_message(
@@ -120,51 +89,88 @@ async def _olap_cmd(client, message):
         except:
             scale = 20
 
+    if EchoImgPool.busy():
+        return await send_message(message, _BUSY)
+
     uid = _uid(poster_url, logo_url, scale)
 
+    sent = await send_message(message, f"<i>Preparing overlay preview | Scale: {scale}%</i>")
+
+    pbytes, lbytes = await gather(_dl(poster_url), _dl(logo_url))
+
+    if not pbytes or not lbytes:
+        try:
+            await edit_message(
+                sent,
+                f"Failed to download one or both images (must be an image under {Config.OVERLAP_MAX_MB} MB)",
+            )
+        except Exception:
+            pass
+        return
+
+    try:
+        session = await OverlaySession.create(pbytes, lbytes, scale)
+        grid = await session.preview()
+    except Exception as e:
+        LOGGER.error(f"Overlap decode failed: {e}")
+        try:
+            await edit_message(sent, "Failed to read one or both images")
+        except Exception:
+            pass
+        return
+
+    OVER_STORE.put(uid, session)
+    await send_message(
+        message,
+        f"🥂Overlay Preview: All Positions | Scale: {scale}%",
+        _ov_buttons(uid),
+        photo=_bio(grid, "preview.jpg"),
+    )
+    await delete_message(sent)
+
+
+def _bio(data, name):
+    out = io.BytesIO(data)
+    out.name = name
+    return out
+
+
+def _ov_buttons(uid, pos=None):
     rows = [
         [
-            InlineKeyboardButton("↖ Top Left", callback_data=f"ov pos {uid} tl"),
-            InlineKeyboardButton("🔼 Top", callback_data=f"ov pos {uid} t"),
-            InlineKeyboardButton("↗ Top Right", callback_data=f"ov pos {uid} tr"),
+            InlineKeyboardButton("↖ Top Left", callback_data=f"ov pv {uid} tl"),
+            InlineKeyboardButton("🔼 Top", callback_data=f"ov pv {uid} t"),
+            InlineKeyboardButton("↗ Top Right", callback_data=f"ov pv {uid} tr"),
         ],
         [
-            InlineKeyboardButton("◀ Middle Left", callback_data=f"ov pos {uid} ml"),
-            InlineKeyboardButton("🎯 Center", callback_data=f"ov pos {uid} c"),
-            InlineKeyboardButton("▶ Middle Right", callback_data=f"ov pos {uid} mr"),
+            InlineKeyboardButton("◀ Middle Left", callback_data=f"ov pv {uid} ml"),
+            InlineKeyboardButton("🎯 Center", callback_data=f"ov pv {uid} c"),
+            InlineKeyboardButton("▶ Middle Right", callback_data=f"ov pv {uid} mr"),
         ],
         [
-            InlineKeyboardButton("↙ Bottom Left", callback_data=f"ov pos {uid} bl"),
-            InlineKeyboardButton("🔽 Bottom", callback_data=f"ov pos {uid} b"),
-            InlineKeyboardButton("↘ Bottom Right", callback_data=f"ov pos {uid} br"),
+            InlineKeyboardButton("↙ Bottom Left", callback_data=f"ov pv {uid} bl"),
+            InlineKeyboardButton("🔽 Bottom", callback_data=f"ov pv {uid} b"),
+            InlineKeyboardButton("↘ Bottom Right", callback_data=f"ov pv {uid} br"),
         ],
         [
-            InlineKeyboardButton("🗑️ Remove", callback_data=f"ov rem {uid}"),
+            InlineKeyboardButton("✨ Auto", callback_data=f"ov pv {uid} auto"),
         ],
     ]
-    buttons = InlineKeyboardMarkup(rows)
-
-    sent = await send_message(message, f"🥂Overlay: None | Scale: {scale}%", buttons=buttons)
-
-    pbytes = await _sync_to_async(_dl, poster_url)
-    lbytes = await _sync_to_async(_dl, logo_url)
-
-    if not pbytes or not lbytes:
-        try:
-            await edit_message(sent, "Failed to download one or both images")
-        except Exception:
-            pass
-        return
+    if pos:
+        rows.append(
+            [
+                InlineKeyboardButton(
+                    f"✅ Full Size: {POS_NAME.get(pos, 'Custom')}",
+                    callback_data=f"ov pos {uid} {pos}",
+                )
+            ]
+        )
+        rows.append([InlineKeyboardButton("🔲 All Positions", callback_data=f"ov grid {uid}")])
+    rows.append([InlineKeyboardButton("🗑️ Remove", callback_data=f"ov rem {uid}")])
+    return InlineKeyboardMarkup(rows)
 
-    OVER_STORE[uid] = {
-        "poster": pbytes,
-        "logo": lbytes,
-        "scale": scale,
-        "time": time.time(),
-        # user_id not urs
-    }
 
-@_task
+@_task("image")
 async def _olap_cb(client, query: CallbackQuery):
     if Image is None:
         await query.answer("Pillow not installed", show_alert=True)
@@ -182,7 +188,7 @@ async def _olap_cb(client, query: CallbackQuery):
     act = parts[1]
     uid = parts[2]
     if act == "rem":
-        entry = OVER_STORE.pop(uid, None)
+        OVER_STORE.pop(uid)
         try:
             await query.message.delete()
         except:
@@ -195,45 +201,162 @@ async def _olap_cb(client, query: CallbackQuery):
 
         await query.answer("Removed")
         return
-    if act == "pos":
-        pos = parts[3] if len(parts) >= 4 else "c"
-        entry = OVER_STORE.get(uid)
-
-        if not entry:
-            await query.answer("Expired")
-            try:
-                await edit_message(query.message, "Session expired or invalid")
-            except:
-                pass
-            return
 
-        await query.answer()
+    entry = OVER_STORE.get(uid)
+    if not entry:
+        await query.answer("Session expired", show_alert=True)
         try:
-            await edit_message(query.message, "Processing...")
+            await edit_reply_markup(query.message, None)
         except:
             pass
+        return
+
+    if act in ("pv", "grid", "pos") and EchoImgPool.busy():
+        return await query.answer(_BUSY, show_alert=True)
 
+    if act in ("pv", "grid"):
+        pos = parts[3] if act == "pv" and len(parts) >= 4 else None
         try:
-            out = await _sync_to_async(
-                partial(_merge_images, entry["poster"], entry["logo"], entry["scale"], pos)
-            )
-            out.name = "overlap.jpg"
+            img = await entry.preview(pos)
+        except Exception as e:
+            LOGGER.error(str(e), exc_info=True)
+            return await query.answer("Failed", show_alert=True)
+        await query.answer()
+        label = POS_NAME.get(pos, "Custom") if pos else "All Positions"
+        await edit_media(
+            query.message,
+            InputMediaPhoto(
+                _bio(img, "preview.jpg"),
+                caption=f"🥂Overlay Preview: {label} | Scale: {entry.scale}%",
+            ),
+            _ov_buttons(uid, pos),
+        )
+        return
+
+    if act == "pos":
+        pos = parts[3] if len(parts) >= 4 else "c"
+        pos_label = POS_NAME.get(pos, "Custom")
+
+        try:
+            out = _bio(await entry.render(pos), "overlap.jpg")
+            OVER_STORE.balance()
+        except Exception as e:
+            LOGGER.error(str(e), exc_info=True)
+            return await query.answer("Failed to process image", show_alert=True)
 
-            pos_label = POS_NAME.get(pos, "Custom")
-            caption = f"🥂Overlay: {pos_label} | Scale: {entry['scale']}%"
+        await query.answer()
+        caption = f"🥂Overlay: {pos_label} | Scale: {entry.scale}%"
+        await send_file(query.message.chat.id, out, caption=caption)
 
-            await send_file(query.message.chat.id, out, caption=caption)
 
-            OVER_STORE.pop(uid, None)
+def _batch_args(args):
+    scale, pos, as_zip, rest = 20, "auto", False, []
+    it = iter(args)
+    for a in it:
+        if a == "-s":
             try:
-                await query.message.delete()
-            except:
+                scale = int(next(it, 20))
+            except ValueError:
                 pass
+        elif a == "-p":
+            pos = next(it, pos)
+        elif a == "-z":
+            as_zip = True
+        else:
+            rest.append(a)
+    if pos not in POS_MAP:
+        pos = "auto"
+    return scale, pos, as_zip, rest
+
+
+async def _tmdb_posters(title):
+    best = await _s(title)
+    if not best:
+        return None, []
+    mt, mid, name, yr = best
+    imgs = await _i(mt, mid)
+    return f"{name} ({yr})" if yr else name, imgs["posters"]
+
+
+@_task("image")
+async def _olap_batch_cmd(client, message):
+    if Image is None:
+        return await send_message(message, "Pillow not found")
+
+    if message.chat.type not in (ChatType.PRIVATE, ChatType.GROUP, ChatType.SUPERGROUP):
+        return
+
+    args = (getattr(message, "command", None) or [])[1:]
+    scale, pos, as_zip, rest = _batch_args(args)
+    if len(rest) < 2:
+        return await send_message(
+            message,
+            "Formate:\n <code>/overlapbatch {logo_url} {poster_url} [poster_url ...] [-s scale] [-p pos] [-z]</code>\n"
+            " <code>/overlapbatch {logo_url} {tmdb title} [-s scale] [-p pos] [-z]</code>",
+        )
+
+    if EchoImgPool.busy():
+        return await send_message(message, _BUSY)
 
+    logo_url, rest = rest[0], rest[1:]
+    sent = await send_message(message, "<i>Collecting posters...</i>")
+
+    label = None
+    if all(u.startswith(("http://", "https://")) for u in rest):
+        urls = rest
+    else:
+        try:
+            label, urls = await _tmdb_posters(" ".join(rest))
         except Exception as e:
-            LOGGER.error(str(e), exc_info=True)
-            await query.answer("Failed")
-            try:
-                await edit_message(query.message, "Failed to process image")
-            except:
-                pass
+            LOGGER.error(f"Overlap batch TMDB lookup failed: {e}")
+            urls = []
+        if not urls:
+            return await edit_message(sent, "<i>No TMDB posters found</i>")
+
+    urls = urls[: Config.OVERLAP_BATCH_MAX]
+    await edit_message(
+        sent,
+        f"<i>Overlaying {len(urls)} posters | Scale: {scale}% | {POS_NAME[pos]}</i>",
+    )
+
+    lbytes, *posters = await gather(_dl(logo_url), *(_dl(u) for u in urls))
+    if not lbytes:
+        return await edit_message(
+            sent,
+            f"Failed to download the logo (must be an image under {Config.OVERLAP_MAX_MB} MB)",
+        )
+    posters = [p for p in posters if p]
+    if not posters:
+        return await edit_message(sent, "Failed to download any poster")
+
+    try:
+        outs = await render_batch(posters, lbytes, scale, pos)
+    except Exception as e:
+        LOGGER.error(f"Overlap batch failed: {e}")
+        return await edit_message(sent, "Failed to read the logo")
+    outs = [o for o in outs if o]
+    if not outs:
+        return await edit_message(sent, "Failed to read any poster")
+
+    caption = f"🥂Overlay: {label or 'Batch'} | {len(outs)}/{len(urls)} | Scale: {scale}% | {POS_NAME[pos]}"
+    err = None
+    if not as_zip:
+        for i in range(0, len(outs), 10):
+            chunk = outs[i : i + 10]
+            media = [
+                InputMediaPhoto(_bio(o, f"overlap_{i + n + 1}.jpg"))
+                for n, o in enumerate(chunk)
+            ]
+            if not i:
+                media[0].caption = caption
+            err = await send_media_group(message, media)
+            if isinstance(err, str):
+                break
+            err = None
+    if as_zip or err:
+        data = await EchoExec.run(
+            "io",
+            _zip_files, [(f"overlap_{n + 1}.jpg", o) for n, o in enumerate(outs)]
+        )
+        await send_file(message, _bio(data, "overlap.zip"), caption=caption)
+    await delete_message(sent)
@@ -7,7 +7,7 @@ from ..helper.utils.msg_util import send_message, edit_message
 from ..helper.utils.xtra import _task
 
 
-@_task
+@_task("search")
 async def _poster_cmd(client, message):
     try:
         if message.chat.type not in (
@@ -7,10 +7,24 @@ from pyrogram.enums import ChatType
 from ..helper.utils.btns import EchoButtons
 from ..helper.utils.msg_util import send_message, send_file, edit_reply_markup
 from .. import LOGGER, user_data, auth_chats, sudo_users
+from ..helper.overlay import OVER_STORE
+from ..helper.tmdb_helper import TMDB_CACHE
+from ..helper.imdb_api import IMDB_CACHE
+from ..helper.utils.authidx import EchoAuth
 from ..helper.utils.db import database
-from ..helper.utils.xtra import _update_user_ldata, safe_int, _task
+from ..helper.utils.execs import EchoExec
+from ..helper.utils.imgpool import EchoImgPool
+from ..helper.utils.net import EchoHTTP
+from ..helper.utils.sched import EchoSched
+from ..helper.utils.tgimg import TG_IMG_CACHE
+from ..helper.utils.xtra import (
+    _update_user_ldata,
+    _get_readable_bytes,
+    safe_int,
+    _task,
+)
 
-@_task
+@_task("owner")
 async def _authorize(client, message):
     try:
         msg = message.text.split()
@@ -36,6 +50,7 @@ async def _authorize(client, message):
                 thread_id = message.message_thread_id
             chat_id = message.chat.id
 
+        await database._hydrate(chat_id)
         if chat_id in user_data and user_data[chat_id].get("AUTH"):
             if (
                 thread_id is not None
@@ -48,20 +63,20 @@ async def _authorize(client, message):
                     user_data[chat_id]["thread_ids"].append(thread_id)
                 else:
                     user_data[chat_id]["thread_ids"] = [thread_id]
-                await database._update_user_data(chat_id)
+                await database._update_user_data(chat_id, "thread_ids")
                 text = "Authorized"
         else:
             _update_user_ldata(chat_id, "AUTH", True)
             if thread_id is not None:
                 _update_user_ldata(chat_id, "thread_ids", [thread_id])
-            await database._update_user_data(chat_id)
+            await database._update_user_data(chat_id, "AUTH", "thread_ids")
             text = "Authorized"
 
         await send_message(message, text)
     except Exception as e:
         LOGGER.error(f"authorize error: {e}")
 
-@_task
+@_task("owner")
 async def _unauthorize(client, message):
     try:
         msg = message.text.split()
@@ -87,16 +102,17 @@ async def _unauthorize(client, message):
                 thread_id = message.message_thread_id
             chat_id = message.chat.id
 
+        await database._hydrate(chat_id)
         if chat_id in user_data and user_data[chat_id].get("AUTH"):
             if thread_id is not None and thread_id in user_data[chat_id].get(
                 "thread_ids", []
             ):
                 user_data[chat_id]["thread_ids"].remove(thread_id)
-                await database._update_user_data(chat_id)
+                await database._update_user_data(chat_id, "thread_ids")
                 text = "Unauthorized"
             else:
                 _update_user_ldata(chat_id, "AUTH", False)
-                await database._update_user_data(chat_id)
+                await database._update_user_data(chat_id, "AUTH")
                 text = "Unauthorized"
         else:
             text = "Already Unauthorized!"
@@ -105,7 +121,7 @@ async def _unauthorize(client, message):
     except Exception as e:
         LOGGER.error(f"unauthorize error: {e}")
         
-@_task
+@_task("owner")
 async def _log_cmd(client, message):
     try:
         if not message.from_user:
@@ -126,7 +142,12 @@ async def _log_cmd(client, message):
     except Exception as e:
         LOGGER.error(f"log_cmd error: {e}")
 
-@_task
+def _read_log():
+    with open("log.txt", "r", encoding="utf-8", errors="ignore") as f:
+        return f.read()
+
+
+@_task("owner")
 async def _log_cb(client, query):
     try:
         data = query.data.split()
@@ -156,8 +177,7 @@ async def _log_cb(client, query):
         if action == "disp":
             await query.answer("Fetching log..")
             try:
-                with open("log.txt", "r", encoding="utf-8", errors="ignore") as f:
-                    content = f.read()
+                content = await EchoExec.run("io", _read_log)
             except FileNotFoundError:
                 await send_message(message, "log.txt not found.")
                 return
@@ -201,7 +221,16 @@ async def _log_cb(client, query):
     except Exception as e:
         LOGGER.error(f"log_cb error: {e}")
 
-@_task
+async def _shutdown():
+    database._stop_sync()
+    await EchoSched.drain()
+    await database._flush()
+    await EchoHTTP.close()
+    EchoImgPool.shutdown()
+    EchoExec.shutdown()
+
+
+@_task("owner")
 async def _restart(client, message):
     try:
         btns = (
@@ -218,7 +247,7 @@ async def _restart(client, message):
     except Exception as e:
         LOGGER.error(f"restart_cmd error: {e}")
 
-@_task
+@_task("owner")
 async def _restart_cb(client, query):
     try:
         await query.answer()
@@ -253,9 +282,59 @@ async def _restart_cb(client, query):
             with open(".restartmsg", "w") as f:
                 f.write(f"{restart_msg.chat.id}\n{restart_msg.id}\n")
 
+            await _shutdown()
             scall(f'"{executable}" update.py', shell=True)
 
             osexecl(executable, executable, "-m", "echobotz")
 
     except Exception as e:
         LOGGER.error(f"restart_cb error: {e}")
+
+
+def _stats_block(title, data):
+    items = [
+        (k, _get_readable_bytes(v) if k.endswith("bytes") else v)
+        for k, v in data.items()
+        if k != "name"
+    ]
+    lines = [f"╭ <b><i>{title} :</i></b>"]
+    for i, (k, v) in enumerate(items):
+        pre = "╰" if i == len(items) - 1 else "╞╴"
+        lines.append(f"{pre} <b>{k.replace('_', ' ').title()}:</b> <code>{v}</code>")
+    return "\n".join(lines)
+
+
+def _collect_stats():
+    lanes = [
+        (f"Lane: {name.title()}", st) for name, st in EchoSched.stats().items()
+    ]
+    pools = [
+        (f"Executor: {name.title()}", st) for name, st in EchoExec.stats().items()
+    ]
+    return lanes + pools + [
+        ("Overlay Sessions", OVER_STORE.stats()),
+        (
+            "Image Pool",
+            {
+                "jobs": EchoImgPool.jobs,
+                "running": EchoImgPool.running,
+                "waiting": EchoImgPool.waiting,
+                "shed": EchoImgPool.shed,
+            },
+        ),
+        ("TMDB Cache", TMDB_CACHE.stats()),
+        ("IMDb Cache", IMDB_CACHE.stats()),
+        ("Photo Cache", TG_IMG_CACHE.stats()),
+        ("File ID Cache", database._fids.stats()),
+        ("DB Writes", database._write_stats()),
+        ("Auth Index", EchoAuth.stats()),
+    ]
+
+
+@_task("owner")
+async def _stats(client, message):
+    try:
+        text = "\n\n".join(_stats_block(t, d) for t, d in _collect_stats())
+        await send_message(message, text)
+    except Exception as e:
+        LOGGER.error(f"stats error: {e}")
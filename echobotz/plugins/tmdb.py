@@ -4,9 +4,9 @@ from echobotz.eco import echo
 from ..helper.tmdb_helper import _s, _i
 from ..helper.utils.msg_util import send_message, edit_message
 from ..helper.utils.btns import EchoButtons
-from ..helper.utils.xtra import _sync_to_async, _task
+from ..helper.utils.xtra import _task
 
-@_task
+@_task("search")
 async def _p(client, message):
     if message.chat.type not in (ChatType.PRIVATE, ChatType.GROUP, ChatType.SUPERGROUP):
         return
@@ -16,12 +16,12 @@ async def _p(client, message):
     q = " ".join(message.command[1:])
     w = await send_message(message, f"Searching:\n<code>{q}</code>")
 
-    r = await _sync_to_async(_s, q)
+    r = await _s(q)
     if not r:
         return await edit_message(w, "Not Found")
 
     kind, mid, title, year = r
-    imgs = await _sync_to_async(_i, kind, mid)
+    imgs = await _i(kind, mid)
 
     t = f"🎬 {title}"
     if year:
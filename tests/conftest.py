@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# config.py and the echobotz package live at the repo root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,93 @@
+import asyncio
+
+from echobotz.helper.bcast import SendStats
+from echobotz.plugins import broadcast
+from echobotz.plugins.broadcast import _Checkpoint
+
+
+class _FakeDb:
+    def __init__(self, uids):
+        self.uids = sorted(uids)
+        self.msgs = []
+        self.saved = {}
+
+    async def _iter_pm_uids(self, after=None, batch=1000):
+        for uid in self.uids:
+            if after is None or uid > after:
+                yield uid
+
+    async def _push_broadcast_msgs(self, bc_id, msgs):
+        self.msgs.extend(msgs)
+
+    async def _save_broadcast(self, bc_id, data):
+        self.saved.update(data)
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+async def _take(ck, n):
+    out = []
+    async for uid in ck.recipients():
+        out.append(uid)
+        if len(out) == n:
+            break
+    return out
+
+
+def test_watermark_only_moves_over_contiguous_finished_uids(monkeypatch):
+    monkeypatch.setattr(broadcast, "database", _FakeDb([1, 2, 3, 4]))
+    ck = _Checkpoint("bc")
+    assert _run(_take(ck, 4)) == [1, 2, 3, 4]
+    ck.finished(2, "s")
+    assert ck.last_uid is None
+    ck.finished(1, "s")
+    assert ck.last_uid == 2
+    ck.finished(4, "s")
+    assert ck.last_uid == 2
+    ck.finished(3, "b")
+    assert ck.last_uid == 4
+
+
+def test_interrupted_sends_are_skipped_on_resume(monkeypatch):
+    db = _FakeDb([1, 2, 3, 4, 5])
+    monkeypatch.setattr(broadcast, "database", db)
+    ck = _Checkpoint("bc")
+    stats = SendStats(5)
+    _run(_take(ck, 4))
+    for uid in (1, 2, 3, 4):
+        ck.begin(uid)
+    # 1 and 3 done, 2 was mid-send when cancelled, 4 done without a message
+    ck.add_msg(1, 101)
+    ck.finished(1, "s")
+    stats.add("s")
+    ck.add_msg(3, 103)
+    ck.finished(3, "s")
+    stats.add("s")
+    ck.finished(4, "u")
+    stats.add("u")
+    _run(ck.flush(stats))
+
+    assert db.saved["last_uid"] == 1
+    assert sorted(db.saved["inflight"]) == [2, 3, 4]
+    assert db.msgs == [(1, 101), (3, 103)]
+
+    resumed = _Checkpoint("bc", db.saved["last_uid"], db.msgs, db.saved["inflight"])
+    assert _run(_take(resumed, 5)) == [5]
+    stats = SendStats(5, db.saved["done"], db.saved["counts"])
+    assert (stats.done, stats.get("s"), stats.get("u")) == (3, 2, 1)
+
+
+def test_flush_drops_inflight_uids_behind_the_watermark(monkeypatch):
+    db = _FakeDb([1, 2, 3])
+    monkeypatch.setattr(broadcast, "database", db)
+    ck = _Checkpoint("bc", None, [], inflight=[7])
+    _run(_take(ck, 3))
+    for uid in (1, 2, 3):
+        ck.begin(uid)
+        ck.finished(uid, "s")
+    _run(ck.flush(SendStats(3), "done"))
+    assert db.saved["last_uid"] == 3
+    assert db.saved["inflight"] == [7]
+    assert db.saved["status"] == "done"
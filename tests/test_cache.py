@@ -0,0 +1,64 @@
+from echobotz.helper.utils import cache
+from echobotz.helper.utils.cache import EchoCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _cache(monkeypatch, **kwargs):
+    clock = _Clock()
+    monkeypatch.setattr(cache, "monotonic", clock)
+    return EchoCache("test", **kwargs), clock
+
+
+def test_hit_miss_and_stats(monkeypatch):
+    c, _ = _cache(monkeypatch)
+    assert c.get("a") is None
+    c.set("a", 1)
+    assert c.get("a") == 1
+    st = c.stats()
+    assert (st["hits"], st["misses"], st["entries"]) == (1, 1, 1)
+
+
+def test_expired_entry_is_stale_but_kept_for_revalidation(monkeypatch):
+    c, clock = _cache(monkeypatch, ttl=10)
+    c.set("a", "v", etag='"x"')
+    clock.now += 11
+    assert c.get("a") is None
+    assert c.stale == 1
+    assert c.peek("a").etag == '"x"'
+    assert c.touch("a") == "v"
+    assert c.get("a") == "v"
+
+
+def test_lru_eviction_by_count(monkeypatch):
+    c, _ = _cache(monkeypatch, maxsize=2)
+    c.set("a", 1)
+    c.set("b", 2)
+    c.get("a")
+    c.set("c", 3)
+    assert "a" in c and "c" in c and "b" not in c
+    assert c.evictions == 1
+
+
+def test_eviction_by_bytes_and_oversized_values(monkeypatch):
+    c, _ = _cache(monkeypatch, max_bytes=100)
+    c.set("a", 1, size=60)
+    c.set("b", 2, size=60)
+    assert "a" not in c and c.bytes == 60
+    c.set("big", 3, size=101)
+    assert "big" not in c and c.bytes == 60
+
+
+def test_replace_and_pop_keep_byte_count(monkeypatch):
+    c, _ = _cache(monkeypatch)
+    c.set("a", 1, size=10)
+    c.set("a", 2, size=30)
+    assert c.bytes == 30
+    assert c.pop("a") == 2
+    assert c.bytes == 0 and c.pop("a", "gone") == "gone"
@@ -0,0 +1,22 @@
+import asyncio
+import logging
+
+from config import Config
+from echobotz.helper.utils.db import _DbManager
+
+
+def test_file_ids_stay_in_memory_without_a_database(monkeypatch, caplog):
+    monkeypatch.setattr(Config, "DATABASE_URL", "")
+    db = _DbManager()
+
+    async def main():
+        assert await db._get_file_id("poster:1") is None
+        await db._set_file_id("poster:1", "AgAD")
+        assert await db._get_file_id("poster:1") == "AgAD"
+        await db._rm_file_id("poster:1")
+        assert await db._get_file_id("poster:1") is None
+
+    with caplog.at_level(logging.ERROR):
+        asyncio.run(main())
+    assert not caplog.records
+    assert db._conn is None
@@ -0,0 +1,82 @@
+import asyncio
+import logging
+
+from config import Config
+from echobotz.helper.utils import db as dbmod
+from echobotz.helper.utils.db import _DbManager, _PmIndex
+
+
+def test_pm_index_lookup_and_discard():
+    idx = _PmIndex([5, 1, 3])
+    idx.add(4)
+    assert len(idx) == 4
+    assert all(u in idx for u in (1, 3, 4, 5))
+    assert 2 not in idx and 6 not in idx
+    idx.discard(3)
+    idx.discard(4)
+    idx.discard(99)
+    assert 3 not in idx and 4 not in idx
+    assert len(idx) == 2
+
+
+def test_pm_index_merges_once_new_outgrows_threshold():
+    idx = _PmIndex(range(0, 4000, 2))
+    for uid in range(1, 2049, 2):
+        idx.add(uid)
+    idx.merge()
+    assert len(idx.new) == 1024
+    idx.add(4001)
+    idx.merge()
+    assert not idx.new
+    assert list(idx.ids) == sorted(idx.ids)
+    assert len(idx) == 2000 + 1025
+    assert 1 in idx and 4001 in idx and 3998 in idx
+
+
+def test_pm_users_are_not_queued_without_a_database(monkeypatch, caplog):
+    monkeypatch.setattr(Config, "DATABASE_URL", "")
+    db = _DbManager()
+
+    async def main():
+        for uid in range(10):
+            await db._set_pm_user(uid)
+        db._kick(Config.DB_FLUSH_BATCH)
+        await db._flush_pm_users()
+        await db._flush()
+
+    with caplog.at_level(logging.ERROR):
+        asyncio.run(main())
+    assert not db._pm_queue
+    assert db._flusher is None
+    assert not caplog.records
+
+
+def test_failed_connects_back_off(monkeypatch):
+    monkeypatch.setattr(Config, "DATABASE_URL", "mongodb://unreachable")
+    db = _DbManager()
+    calls = []
+
+    async def _connect():
+        calls.append(1)
+        db._return = True
+
+    monkeypatch.setattr(db, "_connect", _connect)
+    clock = [1000.0]
+    monkeypatch.setattr(dbmod, "monotonic", lambda: clock[0])
+
+    async def main():
+        for _ in range(5):
+            assert not await db._ensure()
+        assert len(calls) == 1
+        clock[0] += 2
+        assert not await db._ensure()
+        assert len(calls) == 2
+        clock[0] += 2
+        assert not await db._ensure()
+        assert len(calls) == 2
+        clock[0] += 10_000
+        await db._ensure()
+        assert len(calls) == 3
+        assert db._retry_at == clock[0] + 8
+
+    asyncio.run(main())
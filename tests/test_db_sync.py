@@ -0,0 +1,209 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from pymongo.errors import OperationFailure
+
+from config import Config
+from echobotz import user_data
+from echobotz.helper.utils.authidx import EchoAuth
+from echobotz.helper.utils.db import _DbManager
+
+UID = -100888
+OTHER = -100889
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction):
+        self.docs.sort(key=lambda d: d.get(key, 0), reverse=direction < 0)
+        return self
+
+    async def __aiter__(self):
+        for doc in self.docs:
+            yield dict(doc)
+
+
+class _Stream:
+    def __init__(self, changes):
+        self.changes = changes
+        self.resume_token = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def __aiter__(self):
+        for i, change in enumerate(self.changes):
+            self.resume_token = {"_data": i}
+            yield change
+
+
+# In-memory stand-in for the motor auth collection: watch() replays the
+# queued changes (or raises, like a standalone server), writes apply $set /
+# $unset and can be held open with `hold` to catch them in flight, before
+# or (`landed`) after the server applied them.
+class _FakeAuth:
+    def __init__(self, stream=True):
+        self.docs = {}
+        self.changes = []
+        self.stream = stream
+        self.watch_opts = []
+        self.hold = None
+        self.landed = False
+        self.writing = asyncio.Event()
+
+    def watch(self, pipeline, full_document=None, **opts):
+        if not self.stream:
+            raise OperationFailure("not a replica set", code=40573)
+        self.watch_opts.append(opts)
+        changes, self.changes = self.changes, []
+        return _Stream(changes)
+
+    async def create_index(self, key):
+        pass
+
+    def find(self, query):
+        if "_id" in query:
+            ids = query["_id"]["$in"]
+            return _Cursor([d for d in self.docs.values() if d["_id"] in ids])
+        since = query["updated_at"]["$gt"]
+        return _Cursor([d for d in self.docs.values() if d.get("updated_at", 0) > since])
+
+    async def bulk_write(self, ops, ordered=True):
+        if self.landed:
+            for op in ops:
+                self.write(op._filter["_id"], op._doc)
+        self.writing.set()
+        if self.hold is not None:
+            await self.hold.wait()
+        if not self.landed:
+            for op in ops:
+                self.write(op._filter["_id"], op._doc)
+
+    def write(self, uid, upd):
+        doc = self.docs.setdefault(uid, {"_id": uid})
+        doc.update(upd.get("$set", {}))
+        for k in upd.get("$unset", {}):
+            doc.pop(k, None)
+        return dict(doc)
+
+
+def _remote(auth, uid, at, **fields):
+    return auth.write(uid, {"$set": {**fields, "by": "other", "updated_at": at}})
+
+
+def _db(auth):
+    db = _DbManager()
+    db.db = SimpleNamespace(auth=auth)
+    db._return = False
+    return db
+
+
+@pytest.fixture(autouse=True)
+def _clean(monkeypatch):
+    monkeypatch.setattr(Config, "DATABASE_URL", "mongodb://fake")
+    monkeypatch.setattr(Config, "DB_SYNC_INTERVAL", 0.01)
+    yield
+    for uid in (UID, OTHER):
+        user_data.pop(uid, None)
+        EchoAuth.update(uid, {})
+
+
+def test_change_stream_applies_remote_writes_and_skips_own():
+    auth = _FakeAuth()
+    db = _db(auth)
+    db._hydrated.add(UID)
+    user_data[UID] = {"AUTH": False}
+    doc = _remote(auth, UID, 1, AUTH=True, thread_ids=[4])
+    auth.changes.append({"documentKey": {"_id": UID}, "fullDocument": doc})
+    doc = _remote(auth, OTHER, 2, AUTH=True)
+    auth.changes.append({"documentKey": {"_id": OTHER}, "fullDocument": doc})
+    own = {"_id": OTHER, "AUTH": False, "by": db._iid, "updated_at": 3}
+    auth.changes.append({"documentKey": {"_id": OTHER}, "fullDocument": own})
+
+    asyncio.run(db._watch())
+    assert user_data[UID] == {"AUTH": True, "thread_ids": [4]}
+    assert OTHER not in user_data
+    assert EchoAuth.chat_ok(UID, 4) and not EchoAuth.chat_ok(UID, 5)
+    assert EchoAuth.chat_ok(OTHER, None)
+    assert db._synced == 2
+    assert db._resume == {"_data": 2}
+    assert "start_at_operation_time" in auth.watch_opts[0]
+
+    auth.changes.append({"documentKey": {"_id": OTHER}, "fullDocument": None})
+    asyncio.run(db._watch())
+    assert auth.watch_opts[1] == {"resume_after": {"_data": 2}}
+    assert not EchoAuth.chat_ok(OTHER, None)
+
+
+def test_standalone_server_falls_back_to_polling():
+    auth = _FakeAuth(stream=False)
+    db = _db(auth)
+    _remote(auth, UID, db._sync_at + 1, AUTH=True)
+
+    async def main():
+        task = asyncio.create_task(db._sync_loop())
+        for _ in range(200):
+            if EchoAuth.chat_ok(UID, None):
+                break
+            await asyncio.sleep(0.01)
+        _remote(auth, OTHER, db._sync_at + 1, AUTH=True)
+        for _ in range(200):
+            if EchoAuth.chat_ok(OTHER, None):
+                break
+            await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(main())
+    assert db._sync_mode == "poll"
+    assert EchoAuth.chat_ok(UID, None)
+    assert EchoAuth.chat_ok(OTHER, None)
+
+
+def _in_flight_remote_write(landed):
+    auth = _FakeAuth()
+    auth.landed = landed
+    db = _db(auth)
+    db._hydrated.add(UID)
+    auth.hold = asyncio.Event()
+
+    async def main():
+        user_data[UID] = {"AUTH": True, "thread_ids": [1]}
+        await db._update_user_data(UID, "thread_ids")
+        flush = asyncio.create_task(db._flush_user_data())
+        await auth.writing.wait()
+        assert not db._dirty and UID in db._inflight
+
+        # A remote write lands while ours is in flight
+        doc = _remote(auth, UID, 1, AUTH=False, thread_ids=[9], note="x")
+        db._apply(UID, doc)
+        assert user_data[UID] == {"AUTH": False, "thread_ids": [1], "note": "x"}
+        assert UID in db._stale
+
+        auth.hold.set()
+        await flush
+        await db._flush()
+
+    asyncio.run(main())
+    assert not db._stale
+    return auth, db
+
+
+def test_in_flight_keys_are_not_overwritten_by_an_earlier_remote_write():
+    auth, db = _in_flight_remote_write(landed=False)
+    assert auth.docs[UID]["thread_ids"] == [1]
+    assert user_data[UID] == {"AUTH": False, "thread_ids": [1], "note": "x"}
+
+
+# The remote write landed after ours, so Mongo holds its thread_ids; the
+# resync once our write returns brings the local copy back in line.
+def test_in_flight_ids_are_resynced_when_the_remote_write_won():
+    auth, db = _in_flight_remote_write(landed=True)
+    assert auth.docs[UID]["thread_ids"] == [9]
+    assert user_data[UID] == {"AUTH": False, "thread_ids": [9], "note": "x"}
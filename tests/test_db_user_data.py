@@ -0,0 +1,112 @@
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import pytest
+from pymongo.errors import PyMongoError
+
+from config import Config
+from echobotz import user_data
+from echobotz.helper.utils.db import _DbManager
+
+UID = -100777
+
+
+class _FakeAuth:
+    def __init__(self, docs=None, fail=False):
+        self.docs = docs or {}
+        self.fail = fail
+        self.writes = []
+
+    async def find_one(self, query):
+        if self.fail:
+            raise PyMongoError("down")
+        return self.docs.get(query["_id"])
+
+    async def bulk_write(self, ops, ordered=True):
+        self.writes.extend(op._doc for op in ops)
+
+
+def _db(auth):
+    db = _DbManager()
+    db.db = SimpleNamespace(auth=auth)
+    db._return = False
+    return db
+
+
+@pytest.fixture(autouse=True)
+def _clean(monkeypatch):
+    monkeypatch.setattr(Config, "DATABASE_URL", "mongodb://fake")
+    user_data.pop(UID, None)
+    yield
+    user_data.pop(UID, None)
+
+
+def test_nothing_is_tracked_without_a_database(monkeypatch, caplog):
+    monkeypatch.setattr(Config, "DATABASE_URL", "")
+    db = _DbManager()
+
+    async def main():
+        user_data[UID] = {"AUTH": True}
+        await db._update_user_data(UID, "AUTH")
+        await db._update_user_data(UID)
+        await db._flush()
+
+    with caplog.at_level(logging.ERROR):
+        asyncio.run(main())
+    assert not db._dirty
+    assert db._flusher is None
+    assert not caplog.records
+
+
+def test_unhydrated_ids_never_unset_stored_fields():
+    auth = _FakeAuth(fail=True)
+    db = _db(auth)
+
+    async def main():
+        await db._hydrate(UID)
+        assert UID not in db._hydrated
+        user_data[UID] = {"AUTH": True}
+        await db._update_user_data(UID, "AUTH", "thread_ids")
+        await db._flush()
+
+    asyncio.run(main())
+    (upd,) = auth.writes
+    assert "$unset" not in upd
+    assert upd["$set"]["AUTH"] is True
+
+
+def test_hydrated_ids_unset_removed_keys():
+    auth = _FakeAuth({UID: {"_id": UID, "AUTH": True, "thread_ids": [1]}})
+    db = _db(auth)
+
+    async def main():
+        await db._hydrate(UID)
+        del user_data[UID]["thread_ids"]
+        await db._update_user_data(UID, "thread_ids")
+        await db._flush()
+
+    asyncio.run(main())
+    (upd,) = auth.writes
+    assert upd["$unset"] == {"thread_ids": ""}
+
+
+def test_hydrate_fills_stored_keys_under_a_whole_doc_change():
+    auth = _FakeAuth({UID: {"_id": UID, "AUTH": True, "thread_ids": [7], "by": "x"}})
+    db = _db(auth)
+    user_data[UID] = {"AUTH": False}
+    db._dirty[UID] = None
+
+    asyncio.run(db._hydrate(UID))
+    assert UID in db._hydrated
+    assert user_data[UID] == {"AUTH": False, "thread_ids": [7]}
+
+
+def test_hydrate_keeps_locally_removed_dirty_keys_removed():
+    auth = _FakeAuth({UID: {"_id": UID, "AUTH": True, "thread_ids": [7]}})
+    db = _db(auth)
+    user_data[UID] = {"AUTH": True}
+    db._dirty[UID] = {"thread_ids"}
+
+    asyncio.run(db._hydrate(UID))
+    assert user_data[UID] == {"AUTH": True}
@@ -0,0 +1,77 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from echobotz.helper import imdb_api
+
+# Each stubbed lookup blocks its thread this long; a blocking call on the
+# loop would show up as ticker lag of at least this much.
+BLOCK = 0.2
+MAX_LAG = 0.05
+
+
+def _stub(monkeypatch):
+    def search_title(title):
+        time.sleep(BLOCK)
+        return SimpleNamespace(titles=[title])
+
+    def get_movie(movieid):
+        time.sleep(BLOCK)
+        return {"id": movieid}
+
+    monkeypatch.setattr(imdb_api, "search_title", search_title)
+    monkeypatch.setattr(imdb_api, "get_movie", get_movie)
+    imdb_api.IMDB_CACHE.clear()
+
+
+async def _worst_lag(coro, interval=0.01):
+    worst = 0.0
+    done = False
+
+    async def ticker():
+        nonlocal worst
+        while not done:
+            st = time.perf_counter()
+            await asyncio.sleep(interval)
+            worst = max(worst, time.perf_counter() - st - interval)
+
+    t = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    try:
+        res = await coro
+    finally:
+        done = True
+        await t
+    return res, worst
+
+
+def test_lookups_do_not_block_the_event_loop(monkeypatch):
+    _stub(monkeypatch)
+
+    async def lookups():
+        return await asyncio.gather(
+            *(imdb_api._search_title(f"title {i}") for i in range(6)),
+            *(imdb_api._get_movie(f"tt{i:07d}") for i in range(6)),
+        )
+
+    st = time.perf_counter()
+    res, lag = asyncio.run(_worst_lag(lookups()))
+    took = time.perf_counter() - st
+
+    assert res[0] == ["title 0"] and res[6] == {"id": "tt0000000"}
+    assert lag < MAX_LAG, f"event loop stalled for {lag * 1000:.0f}ms"
+    # 12 lookups run in parallel on the imdb pool, not back to back
+    assert took < BLOCK * 12 / 2
+
+
+def test_repeat_lookups_are_cached(monkeypatch):
+    _stub(monkeypatch)
+
+    async def twice():
+        await imdb_api._search_title("Dune")
+        st = time.perf_counter()
+        res = await imdb_api._search_title(" dune ")
+        return res, time.perf_counter() - st
+
+    res, took = asyncio.run(twice())
+    assert res == ["dune"] and took < BLOCK / 2
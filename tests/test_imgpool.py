@@ -0,0 +1,62 @@
+import asyncio
+from io import BytesIO
+
+import pytest
+
+from echobotz.helper import overlay
+from echobotz.helper.utils import imgpool
+from echobotz.helper.utils.imgpool import EchoImgPool, ShmBuf
+
+Image = pytest.importorskip("PIL.Image")
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _pool():
+    yield
+    EchoImgPool.shutdown()
+
+
+def _png(size=(64, 32)):
+    out = BytesIO()
+    Image.new("RGBA", size, (200, 10, 10, 128)).save(out, format="PNG")
+    return out.getvalue()
+
+
+def _decode(monkeypatch, fits):
+    monkeypatch.setattr(imgpool, "_shm_fits", lambda size: fits)
+    EchoImgPool._sem = None
+    return asyncio.run(EchoImgPool.run(overlay._decode_logo, _png()))
+
+
+def test_results_come_back_through_shared_memory(monkeypatch):
+    size, raw = _decode(monkeypatch, True)
+    assert size == (64, 32)
+    assert isinstance(raw, bytes) and len(raw) == 64 * 32 * 4
+    assert raw[:4] == bytes((200, 10, 10, 128))
+
+
+def test_inputs_are_pickled_when_shm_is_short(monkeypatch):
+    size, raw = _decode(monkeypatch, False)
+    assert size == (64, 32)
+    assert len(raw) == 64 * 32 * 4
+
+
+def test_results_are_returned_as_bytes_when_shm_is_short(monkeypatch):
+    monkeypatch.setattr(imgpool, "_shm_fits", lambda size: False)
+    assert imgpool.to_shm(b"raw") == b"raw"
+
+
+def test_shm_segment_refuses_to_overfill(monkeypatch):
+    monkeypatch.setattr(imgpool, "_shm_fits", lambda size: False)
+    with pytest.raises(OSError):
+        ShmBuf.from_bytes(b"x" * 16)
+
+
+def test_busy_sheds_past_the_queue_bound(monkeypatch):
+    monkeypatch.setattr(imgpool.Config, "IMG_QUEUE", 2)
+    monkeypatch.setattr(EchoImgPool, "running", 1)
+    monkeypatch.setattr(EchoImgPool, "waiting", 0)
+    monkeypatch.setattr(EchoImgPool, "shed", 0)
+    assert not EchoImgPool.busy()
+    EchoImgPool.waiting = 1
+    assert EchoImgPool.busy() and EchoImgPool.shed == 1
@@ -0,0 +1,87 @@
+import asyncio
+import os
+from io import BytesIO
+
+import pytest
+
+from echobotz.helper.overlay import OverlaySession, _auto_pos, render_batch
+from echobotz.helper.utils.imgpool import EchoImgPool
+
+Image = pytest.importorskip("PIL.Image")
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _pool():
+    EchoImgPool._sem = None
+    yield
+    EchoImgPool.shutdown()
+
+
+def _img(mode, size, color, fmt):
+    out = BytesIO()
+    Image.new(mode, size, color).save(out, format=fmt)
+    return out.getvalue()
+
+
+def _shm():
+    try:
+        return {n for n in os.listdir("/dev/shm") if n.startswith("psm_")}
+    except OSError:
+        return set()
+
+
+def test_session_renders_from_heap_buffers_and_leaves_no_shm():
+    poster = _img("RGB", (600, 900), (20, 40, 60), "JPEG")
+    logo = _img("RGBA", (200, 100), (255, 255, 255, 255), "PNG")
+    before = _shm()
+
+    async def main():
+        s = await OverlaySession.create(poster, logo, 20)
+        grid = await s.preview()
+        first = await s.render("br")
+        again = await s.render("tl")
+        s.spill()
+        spilled = await s.render("c")
+        return s, grid, first, again, spilled
+
+    s, *jpegs = asyncio.run(main())
+    for j in jpegs:
+        assert j[:2] == b"\xff\xd8"
+    assert Image.open(BytesIO(jpegs[1])).size == (600, 900)
+    assert s.sizes["poster"] == (600, 900) and s.sizes["logo"] == (120, 60)
+    assert s.spilled >= {"poster", "logo"}
+    assert _shm() <= before
+
+
+def test_batch_keeps_poster_order_and_marks_failures():
+    posters = [
+        _img("RGB", (300, 450), (200, 0, 0), "JPEG"),
+        b"not an image",
+        _img("RGB", (300, 450), (0, 0, 200), "PNG"),
+    ]
+    logo = _img("RGBA", (100, 50), (255, 255, 255, 200), "PNG")
+    out = asyncio.run(render_batch(posters, logo, 20, "b"))
+    assert out[0][:2] == b"\xff\xd8" and out[1] is None and out[2][:2] == b"\xff\xd8"
+
+
+def _busy_except(size, quiet_box):
+    np = pytest.importorskip("numpy")
+    rng = np.random.default_rng(0)
+    arr = rng.integers(0, 255, (size[1], size[0], 3)).astype(np.uint8)
+    x0, y0, x1, y1 = quiet_box
+    arr[y0:y1, x0:x1] = 30
+    return Image.fromarray(arr, "RGB")
+
+
+@pytest.mark.parametrize(
+    "box, want",
+    [
+        ((0, 0, 300, 200), "tl"),
+        ((500, 1000, 800, 1200), "br"),
+        ((250, 1000, 550, 1200), "b"),
+    ],
+)
+def test_auto_pos_picks_the_only_quiet_region(box, want):
+    im = _busy_except((800, 1200), box)
+    lg = Image.new("RGBA", (240, 120), (255, 255, 255, 255))
+    assert _auto_pos(im, lg) == want
@@ -0,0 +1,88 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from pyrogram import filters
+
+from echobotz.core.EchoClient import EchoBot
+from echobotz.core.router import EchoRouter
+
+SAMPLES = [
+    "/start",
+    "/imdb the matrix",
+    "/imdb   spaced    out  ",
+    '/ov "two words" tail',
+    "/ov 'single quoted' x",
+    r'/ov "esc \"quote\"" y',
+    "/start@EchoTestBot arg",
+    "/start@otherbot arg",
+    "/start\nnext line",
+    "/ start",
+    "/",
+    "/ ",
+    "/@EchoTestBot",
+    "start",
+    "",
+]
+
+
+@pytest.fixture(autouse=True)
+def _username(monkeypatch):
+    monkeypatch.setattr(EchoBot, "USERNAME", "EchoTestBot")
+
+
+def _pyro(text):
+    client = SimpleNamespace(me=SimpleNamespace(username=EchoBot.USERNAME))
+    msg = SimpleNamespace(text=text, caption=None, command=None)
+    flt = filters.command(["start", "imdb", "ov"], case_sensitive=True)
+    ok = asyncio.run(flt(client, msg))
+    return msg.command if ok else None
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_parse_matches_pyrogram(text):
+    assert EchoRouter._parse(text) == _pyro(text)
+
+
+def test_parse_args():
+    assert EchoRouter._parse("/imdb the matrix") == ["imdb", "the", "matrix"]
+    assert EchoRouter._parse('/ov "a b" c') == ["ov", "a b", "c"]
+    assert EchoRouter._parse("/start@echotestbot") == ["start"]
+
+
+@pytest.mark.parametrize("text", [None, "", "/", "/ ", "/ x", "/\tx", "/@EchoTestBot", "x /y"])
+def test_parse_rejects_empty_command(text):
+    assert EchoRouter._parse(text) is None
+
+
+def test_only_matched_route_filter_runs(monkeypatch):
+    calls = []
+
+    def _flt(tag, ok=True):
+        async def f(client, update):
+            calls.append(tag)
+            return ok
+
+        return f
+
+    async def _handler(client, message):
+        calls.append(("ran", message.command))
+
+    monkeypatch.setattr(EchoRouter, "cmds", {})
+    EchoRouter.command(["a"], _handler, _flt("a"))
+    EchoRouter.command(["b"], _handler, _flt("b", ok=False))
+    EchoRouter.command(["c"], _handler, None)
+
+    async def _send(text):
+        await EchoRouter._on_message(None, SimpleNamespace(text=text, caption=None))
+
+    asyncio.run(_send("/a 1"))
+    assert calls == ["a", ("ran", ["a", "1"])]
+    calls.clear()
+    asyncio.run(_send("/b"))
+    assert calls == ["b"]
+    calls.clear()
+    asyncio.run(_send("/c"))
+    asyncio.run(_send("/ a"))
+    asyncio.run(_send("/z"))
+    assert calls == [("ran", ["c"])]
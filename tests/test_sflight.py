@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from echobotz.helper.utils.sflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_task():
+    async def main():
+        sf = SingleFlight("test")
+        calls = 0
+
+        async def fetch(x):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return x * 2
+
+        res = await asyncio.gather(*(sf.do("k", fetch, 21) for _ in range(5)))
+        assert res == [42] * 5
+        assert calls == 1 and sf.shared == 4 and len(sf) == 0
+
+        assert await sf.do("k", fetch, 1) == 2
+        assert calls == 2
+
+    asyncio.run(main())
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    async def main():
+        sf = SingleFlight("test")
+
+        async def boom():
+            await asyncio.sleep(0.01)
+            raise ValueError("upstream")
+
+        res = await asyncio.gather(
+            sf.do("k", boom), sf.do("k", boom), return_exceptions=True
+        )
+        assert all(isinstance(r, ValueError) for r in res)
+        assert len(sf) == 0
+
+    asyncio.run(main())
+
+
+def test_cancelling_one_waiter_keeps_the_shared_call():
+    async def main():
+        sf = SingleFlight("test")
+        gate = asyncio.Event()
+
+        async def fetch():
+            await gate.wait()
+            return "ok"
+
+        a = asyncio.create_task(sf.do("k", fetch))
+        b = asyncio.create_task(sf.do("k", fetch))
+        await asyncio.sleep(0)
+        a.cancel()
+        await asyncio.sleep(0)
+        gate.set()
+        assert await b == "ok"
+        with pytest.raises(asyncio.CancelledError):
+            await a
+
+    asyncio.run(main())
+
+
+def test_last_waiter_cancel_cancels_the_call():
+    async def main():
+        sf = SingleFlight("test")
+        started = asyncio.Event()
+        cancelled = False
+
+        async def fetch():
+            nonlocal cancelled
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled = True
+                raise
+
+        t = asyncio.create_task(sf.do("k", fetch))
+        await started.wait()
+        t.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await t
+        await asyncio.sleep(0)
+        assert cancelled and len(sf) == 0
+
+    asyncio.run(main())
@@ -0,0 +1,51 @@
+from io import BytesIO
+
+import pytest
+
+from echobotz.helper.utils.tgimg import _tg_fit
+
+Image = pytest.importorskip("PIL.Image")
+np = pytest.importorskip("numpy")
+
+
+def _enc(im, fmt, **kw):
+    out = BytesIO()
+    im.save(out, format=fmt, **kw)
+    return out.getvalue()
+
+
+def _open(data):
+    im = Image.open(BytesIO(data))
+    im.load()
+    return im
+
+
+def test_compliant_jpeg_is_left_alone():
+    data = _enc(Image.new("RGB", (500, 750), (10, 20, 30)), "JPEG")
+    assert _tg_fit(data, 2560, 5 * 1024 * 1024) is None
+
+
+def test_large_image_is_downscaled_to_max_side():
+    data = _enc(Image.new("RGB", (4000, 6000), (10, 20, 30)), "JPEG")
+    out = _open(_tg_fit(data, 2560, 5 * 1024 * 1024))
+    assert out.format == "JPEG" and max(out.size) == 2560
+
+
+def test_transparent_png_is_flattened_on_white():
+    im = Image.new("RGBA", (200, 100), (0, 0, 0, 0))
+    out = _open(_tg_fit(_enc(im, "PNG"), 2560, 5 * 1024 * 1024))
+    assert out.mode == "RGB" and out.getpixel((10, 10)) >= (250, 250, 250)
+
+
+def test_extreme_aspect_ratio_is_padded_to_twenty_to_one():
+    data = _enc(Image.new("RGB", (4200, 100), (200, 0, 0)), "JPEG")
+    out = _open(_tg_fit(data, 5000, 5 * 1024 * 1024))
+    w, h = out.size
+    assert w <= 20 * h and w == 4200
+
+
+def test_output_fits_the_byte_budget():
+    noise = np.random.default_rng(0).integers(0, 255, (1500, 1000, 3), dtype=np.uint8)
+    data = _enc(Image.fromarray(noise, "RGB"), "PNG")
+    out = _tg_fit(data, 2560, 200 * 1024)
+    assert len(out) <= 200 * 1024 and _open(out).format == "JPEG"
@@ -0,0 +1,11 @@
+from echobotz.helper.tmdb_helper import _qkey
+
+
+def test_query_key_collapses_case_space_and_punctuation():
+    assert _qkey("  The  Dark-Knight ") == _qkey("the dark knight")
+
+
+def test_query_key_keeps_non_latin_titles_apart():
+    keys = {_qkey(t) for t in ("進撃の巨人", "鬼滅の刃", "Брат 2", "कहो ना", "कहा ना")}
+    assert len(keys) == 5
+    assert "" not in keys